@@ -0,0 +1,32 @@
+"""Shared building blocks for the agent_* JSON-RPC servers."""
+
+from agent_common.cache import ResponseCache
+from agent_common.cards import AgentCard
+from agent_common.clients import (
+    SharedClient,
+    agent_lifespan,
+    create_github_models_client,
+    create_groq_client,
+    create_openrouter_client,
+)
+from agent_common.executor import InferenceExecutor
+from agent_common.ratelimit import RateLimiter, RateLimitExceeded
+from agent_common.service import AgentService
+from agent_common.singleflight import SingleFlight
+from agent_common.streaming import iter_deltas
+
+__all__ = [
+    "AgentCard",
+    "AgentService",
+    "InferenceExecutor",
+    "RateLimitExceeded",
+    "RateLimiter",
+    "ResponseCache",
+    "SharedClient",
+    "SingleFlight",
+    "agent_lifespan",
+    "create_github_models_client",
+    "create_groq_client",
+    "create_openrouter_client",
+    "iter_deltas",
+]
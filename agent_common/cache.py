@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import TTLCache
+
+CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", "3600"))
+CACHE_PATH = os.getenv("AGENT_CACHE_PATH", "")
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def cache_key(user_query: str, model: str, sampling: dict, history=()) -> str:
+    """Stable key over the normalized query, model, sampling params and conversation history."""
+    fields = {
+        "q": normalize_query(user_query),
+        "model": model,
+        "temperature": sampling.get("temperature"),
+        "top_p": sampling.get("top_p"),
+        "max_tokens": sampling.get("max_tokens"),
+    }
+    if history:
+        fields["history"] = history
+    material = json.dumps(fields, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU/TTL cache of answers with an optional SQLite tier.
+
+    The SQLite file (`path`, or AGENT_CACHE_PATH) survives restarts; memory
+    misses fall through to it and promote hits back into memory. `get` and
+    `put` are coroutines: memory is served on the event loop, SQLite reads
+    and commits run on a worker thread (`asyncio.to_thread`).
+    A `max_entries` of 0 disables caching.
+    Agents use `ResponseCache.shared()`, so agents loaded into one gateway
+    process share a single cache; keys already include the model.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "ResponseCache":
+        """The process-wide cache built from the AGENT_CACHE_* settings."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL, path: str = CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._memory = TTLCache(maxsize=max(max_entries, 1), ttl=ttl)
+        self._lock = threading.Lock()  # memory tier; never held across disk I/O
+        self._db_lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def start(self):
+        if not (self.enabled and self.path) or self._db is not None:
+            return
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db_lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, answer TEXT, expires REAL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+
+    async def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            answer = self._memory.get(key)
+        if answer is None and self._db is not None:
+            answer = await asyncio.to_thread(self._read, key)
+            if answer is not None:
+                self.disk_hits += 1
+                with self._lock:
+                    self._memory[key] = answer
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    async def put(self, key: str, answer: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._memory[key] = answer
+        if self._db is not None:
+            await asyncio.to_thread(self._write, key, answer, time.time() + self.ttl)
+
+    def _read(self, key: str):
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT answer FROM responses WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, key: str, answer: str, expires: float):
+        with self._db_lock:
+            if self._db is None:
+                return
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, answer, expires) VALUES (?, ?, ?)",
+                    (key, answer, expires),
+                )
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._memory),
+        }
+
+    def close(self):
+        with self._db_lock:
+            db, self._db = self._db, None
+        if db is not None:
+            db.close()
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+
+from fastapi import Request, Response
+
+CARD_MAX_AGE = int(os.getenv("AGENT_CARD_MAX_AGE", "300"))
+
+
+class AgentCard:
+    """Agent card read once at startup and served with an ETag and Cache-Control.
+
+    Conditional requests (`If-None-Match`) that match get a bodyless 304.
+    When `endpoint` is set it replaces the card's own `endpoint` (the
+    gateway serves each agent under its own path).
+    """
+
+    def __init__(self, path: str, max_age: int = CARD_MAX_AGE, endpoint: str = None):
+        self.path = path
+        self.max_age = max_age
+        self.endpoint = endpoint
+        self._body = None
+        self._etag = None
+        self._error = None
+
+    def start(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                card = json.load(f)
+        except Exception as e:
+            self._error = {"error": f"Failed to load agent card: {str(e)}"}
+            return
+        if self.endpoint:
+            card["endpoint"] = self.endpoint
+        self._body = json.dumps(card).encode("utf-8")
+        self._etag = '"' + hashlib.sha256(self._body).hexdigest()[:32] + '"'
+
+    def close(self):
+        pass
+
+    def response(self, request: Request) -> Response:
+        if self._body is None and self._error is None:
+            self.start()
+        if self._body is None:
+            return Response(json.dumps(self._error), media_type="application/json")
+
+        headers = {"ETag": self._etag, "Cache-Control": f"max-age={self.max_age}"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if self._etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+        return Response(self._body, media_type="application/json", headers=headers)
@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+from agent_common.executor import MAX_INFLIGHT
+
+# --- Upstream endpoints (overridable, e.g. to point at bench/mock_upstream.py) ---
+GITHUB_MODELS_ENDPOINT = os.getenv("GITHUB_MODELS_ENDPOINT", "https://models.github.ai/inference")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# --- Connection pool settings (shared by every provider) ---
+# 0 sizes each pool from the executors sharing it: AGENT_MAX_INFLIGHT per agent using the client
+POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "0"))
+KEEPALIVE_SECONDS = float(os.getenv("AGENT_KEEPALIVE_SECONDS", "60"))
+CONNECT_TIMEOUT = float(os.getenv("AGENT_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("AGENT_READ_TIMEOUT", "120"))
+
+# --- Startup: build the client (and import its SDK) eagerly, in the background or on first use ---
+PRELOAD = os.getenv("AGENT_PRELOAD", "background")
+# Open a pooled connection to the upstream before reporting ready
+WARMUP = os.getenv("AGENT_WARMUP", "0").lower() in ("1", "true", "yes")
+
+# client -> callable that opens a keep-alive connection in the client's pool
+_warmers = weakref.WeakKeyDictionary()
+
+
+def _httpx_client(pool_size):
+    """Pooled keep-alive HTTP client for the OpenAI-compatible SDKs; calls past `pool_size` wait for a connection."""
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=KEEPALIVE_SECONDS,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+def create_github_models_client(token: str, pool_size: int = MAX_INFLIGHT):
+    """ChatCompletionsClient for models.github.ai backed by a pooled requests session.
+
+    `pool_block` makes calls past `pool_size` wait for a pooled connection
+    instead of opening one that is discarded afterwards.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from azure.ai.inference import ChatCompletionsClient
+    from azure.core.credentials import AzureKeyCredential
+    from azure.core.pipeline.transport import RequestsTransport
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True))
+    transport = RequestsTransport(
+        session=session,
+        session_owner=True,
+        connection_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    )
+    client = ChatCompletionsClient(
+        endpoint=GITHUB_MODELS_ENDPOINT,
+        credential=AzureKeyCredential(token),
+        transport=transport,
+        retry_total=0,  # retries and Retry-After are handled by AgentService
+    )
+    _warmers[client] = lambda: session.head(GITHUB_MODELS_ENDPOINT, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)).close()
+    return client
+
+
+def create_groq_client(api_key: str, pool_size: int = MAX_INFLIGHT):
+    """Groq client sharing one pooled httpx connection pool."""
+    from groq import Groq
+
+    http = _httpx_client(pool_size)
+    client = Groq(api_key=api_key, base_url=GROQ_BASE_URL, http_client=http, max_retries=0)
+    _warmers[client] = lambda: http.head(GROQ_BASE_URL).close()
+    return client
+
+
+def create_openrouter_client(api_key: str, pool_size: int = MAX_INFLIGHT):
+    """OpenAI SDK client pointed at OpenRouter with a pooled httpx connection pool."""
+    from openai import OpenAI
+
+    http = _httpx_client(pool_size)
+    client = OpenAI(base_url=OPENROUTER_BASE_URL, api_key=api_key, http_client=http, max_retries=0)
+    _warmers[client] = lambda: http.head(OPENROUTER_BASE_URL).close()
+    return client
+
+
+def warm_up(client):
+    """Open a keep-alive connection in `client`'s pool (DNS, TCP, TLS) ahead of the first request.
+
+    Any HTTP status counts; only the connection matters.
+    """
+    warm = _warmers.get(client)
+    if warm is not None:
+        warm()
+
+
+class SharedClient:
+    """One process-wide upstream client, created at startup and closed on shutdown.
+
+    `factory` is called with `credential`; nothing is created while the
+    credential is empty so the agent can still report a missing-key error.
+    Use `SharedClient.shared()` so agents on the same provider and
+    credential reuse one client (and pool) when loaded into one process;
+    the pool then has room for every sharing agent's executor
+    (`AGENT_MAX_INFLIGHT` each) unless `AGENT_POOL_SIZE` fixes its size.
+
+    `preload` decides when `start()` builds the client: "eager" blocks
+    startup, "background" (the default) builds it on a thread so the server
+    comes up at once, "lazy" waits for the first request. With `warmup`, a
+    connection to the upstream is opened as part of that build. `ready` is
+    False until the build (and warmup) has succeeded, and stays False
+    without a credential or while `error` is set.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, factory, credential: str) -> "SharedClient":
+        """The process-wide SharedClient for this factory and credential."""
+        with cls._registry_lock:
+            client = cls._registry.get((factory, credential))
+            if client is None:
+                client = cls._registry[(factory, credential)] = cls(factory, credential)
+            client.users += 1
+            return client
+
+    def __init__(self, factory, credential: str, preload: str = PRELOAD, warmup: bool = WARMUP):
+        self._factory = factory
+        self._credential = credential
+        self._client = None
+        self._lock = threading.Lock()
+        self.preload = preload
+        self.warmup = warmup
+        self._prepared = threading.Event()
+        self.started = False
+        self.setup_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.error = None
+        self.users = 0  # agents sharing this client, each with its own executor
+
+    @property
+    def pool_size(self) -> int:
+        return POOL_SIZE or MAX_INFLIGHT * max(self.users, 1)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._credential)
+
+    @property
+    def ready(self) -> bool:
+        if not self.started or not self.configured or self.error is not None:
+            return False
+        return self.preload == "lazy" or self._prepared.is_set()
+
+    def start(self):
+        self.started = True
+        if not self.configured or self.preload == "lazy":
+            return
+        if self.preload == "background":
+            threading.Thread(target=self._prepare, name="upstream-preload", daemon=True).start()
+        else:
+            self._prepare()
+
+    def _prepare(self):
+        try:
+            client = self.get()
+            if self.warmup:
+                started = time.perf_counter()
+                warm_up(client)
+                self.warmup_seconds = time.perf_counter() - started
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+        finally:
+            self._prepared.set()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "configured": self.configured,
+            "preload": self.preload,
+            "client_setup_seconds": round(self.setup_seconds, 4),
+            "warmup_seconds": round(self.warmup_seconds, 4) if self.warmup else None,
+            "error": self.error,
+        }
+
+    def get(self):
+        if self._client is None:
+            if not self.configured:
+                raise RuntimeError("Upstream client is not configured")
+            with self._lock:
+                if self._client is None:
+                    started = time.perf_counter()
+                    self._client = self._factory(self._credential, self.pool_size)
+                    self.setup_seconds = time.perf_counter() - started
+                    self.error = None  # a later build succeeded after a failed preload
+        return self._client
+
+    def install(self, client):
+        """Use an already-built client (e.g. one pointed at a mock upstream)."""
+        self._client = client
+
+    def close(self):
+        self.started = False
+        client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+
+def agent_lifespan(*resources):
+    """FastAPI lifespan that starts each resource on startup and closes it on shutdown.
+
+    A resource passed more than once (shared between agents) is started and
+    closed once.
+    """
+    unique = []
+    for resource in resources:
+        if not any(resource is seen for seen in unique):
+            unique.append(resource)
+    resources = tuple(unique)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        for resource in resources:
+            resource.start()
+        try:
+            yield
+        finally:
+            for resource in reversed(resources):
+                resource.close()
+
+    return lifespan
@@ -0,0 +1,59 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_INFLIGHT = int(os.getenv("AGENT_MAX_INFLIGHT", "16"))
+
+
+class InferenceExecutor:
+    """Bounded thread pool that runs blocking SDK calls off the event loop.
+
+    At most `max_inflight` upstream calls run at once; further calls wait in
+    the pool's queue while the event loop keeps serving other requests.
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT, name: str = "inference"):
+        self.max_inflight = max_inflight
+        self._name = name
+        self._pool = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.pending = 0
+
+    def start(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_inflight, thread_name_prefix=self._name
+                    )
+
+    async def run(self, fn, *args, **kwargs):
+        self.start()
+        self.pending += 1
+        call = functools.partial(self._tracked, fn, *args, **kwargs)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+        finally:
+            self.pending -= 1
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a free worker."""
+        return max(self.pending - self.in_flight, 0)
+
+    def _tracked(self, fn, *args, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,96 @@
+import importlib.util
+import logging
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+from agent_common.clients import agent_lifespan
+from agent_common.jsonrpc import dumps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Agents served by the gateway: path prefix -> agent directory ---
+GATEWAY_AGENTS = {
+    "openai": "agent_openAI",
+    "deepseek": "agent_deepseek",
+    "groq": "agent_groq",
+    "llama": "agent_llama",
+    "gemma": "agent_google_gemma",
+}
+# Public base URL of the gateway, used for the `endpoint` advertised in each card
+GATEWAY_URL = os.getenv("AGENT_GATEWAY_URL", "http://localhost:8080").rstrip("/")
+# Comma-separated prefixes to mount; empty mounts all of them
+GATEWAY_ENABLED = os.getenv("GATEWAY_AGENTS", "")
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def load_agent(directory: str):
+    """Import `<directory>/main.py` under a unique module name."""
+    name = f"{directory}.main"
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, directory, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def create_gateway(agents=None, base_url: str = GATEWAY_URL) -> FastAPI:
+    """One FastAPI app serving every agent's router under `/<prefix>`.
+
+    The agents keep their `/rpc`, `/metrics` and card routes, so
+    `<base_url>/<prefix>/rpc` behaves like the agent's own port; `/ready`
+    is 200 once every requested agent is mounted and ready. They share
+    the event loop, the pooled upstream clients (one per provider and
+    credential) and the response cache. An agent that fails to import is
+    logged and left out instead of taking the gateway down.
+    """
+    if agents is None:
+        enabled = [prefix.strip() for prefix in GATEWAY_ENABLED.split(",") if prefix.strip()]
+        agents = {prefix: GATEWAY_AGENTS[prefix] for prefix in enabled or GATEWAY_AGENTS}
+
+    mounted, skipped = {}, {}
+    for prefix, directory in agents.items():
+        try:
+            module = load_agent(directory)
+        except Exception as e:
+            logger.warning("Gateway: skipping %s (%s): %s", prefix, directory, e)
+            skipped[prefix] = {"ready": False, "mounted": False, "error": f"{type(e).__name__}: {str(e)}"}
+            continue
+        module.card.endpoint = f"{base_url}/{prefix}/rpc"
+        mounted[prefix] = module
+
+    resources = [resource for module in mounted.values() for resource in module.resources]
+    app = FastAPI(title="Multi-Agent Gateway", lifespan=agent_lifespan(*resources))
+    for prefix, module in mounted.items():
+        app.include_router(module.router, prefix=f"/{prefix}")
+
+    @app.get("/")
+    async def index():
+        return {
+            "agents": {
+                prefix: {
+                    "title": module.title,
+                    "card": f"{base_url}/{prefix}/.well-known/agent.json",
+                    "rpc": f"{base_url}/{prefix}/rpc",
+                }
+                for prefix, module in mounted.items()
+            }
+        }
+
+    @app.get("/ready")
+    async def ready():
+        agents = {prefix: module.service.upstream.status() for prefix, module in mounted.items()}
+        agents.update(skipped)
+        status_code = 200 if all(status["ready"] for status in agents.values()) else 503
+        return Response(content=dumps({"agents": agents}), status_code=status_code, media_type="application/json")
+
+    return app
@@ -0,0 +1,201 @@
+from typing import Optional
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib codec gives identical output, just slower
+    import json
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    loads = json.loads
+
+# --- JSON-RPC / A2A error codes used by the agents ---
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INFERENCE_FAILED = -32000
+MISSING_CREDENTIALS = -32001
+RATE_LIMITED = -32002
+TASK_NOT_FOUND = -32003
+TASK_NOT_CANCELABLE = -32004
+
+
+class InvalidRequest(ValueError):
+    def __init__(self, rpc_id=None):
+        super().__init__("Invalid Request")
+        self.rpc_id = rpc_id
+
+
+class RpcCall:
+    """One parsed JSON-RPC request, with the task fields the agents need pulled out in one pass."""
+
+    __slots__ = ("id", "method", "params", "task_id", "session_id", "user_query", "metadata")
+
+    def __init__(self, rpc_id, method, params, task_id, session_id, user_query, metadata):
+        self.id = rpc_id
+        self.method = method
+        self.params = params
+        self.task_id = task_id
+        self.session_id = session_id
+        self.user_query = user_query
+        self.metadata = metadata
+
+
+def parse_call(obj) -> RpcCall:
+    """Validate a decoded request object; raises InvalidRequest."""
+    if type(obj) is not dict:
+        raise InvalidRequest()
+    rpc_id = obj.get("id")
+    method = obj.get("method")
+    params = obj.get("params", {})
+    if (obj.get("jsonrpc") != "2.0" or type(rpc_id) is not str
+            or type(method) is not str or type(params) is not dict):
+        raise InvalidRequest(rpc_id if type(rpc_id) in (str, int) else None)
+
+    # Text of the first `text` part of the task message, or ""
+    user_query = ""
+    message = params.get("message")
+    if type(message) is dict:
+        for part in message.get("parts") or ():
+            if type(part) is dict and part.get("type") == "text":
+                text = part.get("text", "")
+                user_query = text if type(text) is str else ""
+                break
+
+    metadata = params.get("metadata")
+    session_id = params.get("sessionId")
+    return RpcCall(rpc_id, method, params, params.get("id"), session_id if type(session_id) is str else None,
+                   user_query, metadata if type(metadata) is dict else {})
+
+
+class Encoded(bytes):
+    """Serialized JSON-RPC response; `outcome` feeds the request metrics."""
+
+    outcome = "ok"
+
+    @classmethod
+    def of(cls, payload, outcome="ok"):
+        encoded = cls(payload)
+        encoded.outcome = outcome
+        return encoded
+
+
+def rpc_error(rpc_id, code: int, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "error": {"code": code, "message": message}
+    }
+
+
+def text_artifact(text: str, append: bool = False, last_chunk: bool = True) -> dict:
+    return {
+        "parts": [
+            {"type": "text", "text": {"raw": text}}
+        ],
+        "index": 0,
+        "append": append,
+        "lastChunk": last_chunk
+    }
+
+
+def task_result(rpc_id, task_id, text: str, metadata: Optional[dict] = None, session_id=None) -> dict:
+    """Completed `tasks/send` response carrying the whole answer as one artifact."""
+    return {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "result": {
+            "id": task_id,
+            "sessionId": session_id,
+            "status": {"state": "completed"},
+            "artifacts": [text_artifact(text)],
+            "metadata": metadata or {}
+        }
+    }
+
+
+def task_status(rpc_id, task_id, state: str, error: Optional[dict] = None, session_id=None) -> dict:
+    """Task that has no answer (yet): submitted, working, failed or canceled."""
+    status = {"state": state}
+    if error:
+        status["message"] = {"role": "agent", "parts": [{"type": "text", "text": error["message"]}]}
+    return {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "result": {
+            "id": task_id,
+            "sessionId": session_id,
+            "status": status,
+            "metadata": {"error": error} if error else {}
+        }
+    }
+
+
+# --- Prebuilt task_result() envelope: only id, task id, text and metadata are filled in ---
+_RESULT_HEAD = b'{"jsonrpc":"2.0","id":'
+_RESULT_TASK = b',"result":{"id":'
+_RESULT_SESSION = b',"sessionId":'
+_RESULT_TEXT = b',"status":{"state":"completed"},"artifacts":[{"parts":[{"type":"text","text":{"raw":'
+_RESULT_META = b'}}],"index":0,"append":false,"lastChunk":true}],"metadata":'
+_RESULT_TAIL = b'}}'
+_EMPTY_METADATA = b"{}"
+_NULL = b"null"
+
+
+def encode_task_result(rpc_id, task_id, text: str, metadata: Optional[dict] = None, session_id=None) -> Encoded:
+    """Byte-for-byte the JSON of task_result(), without building the nested dict."""
+    return Encoded.of(
+        b"".join((
+            _RESULT_HEAD, dumps(rpc_id),
+            _RESULT_TASK, dumps(task_id),
+            _RESULT_SESSION, _NULL if session_id is None else dumps(session_id),
+            _RESULT_TEXT, dumps(text),
+            _RESULT_META, dumps(metadata) if metadata else _EMPTY_METADATA,
+            _RESULT_TAIL,
+        )),
+        "cached" if metadata and metadata.get("cached") else "ok",
+    )
+
+
+def encode(response) -> Encoded:
+    """Encode a response dict (errors, events) unless it is already encoded."""
+    if isinstance(response, Encoded):
+        return response
+    return Encoded.of(dumps(response), "error" if "error" in response else "ok")
+
+
+def encode_batch(responses) -> Encoded:
+    return Encoded.of(b"[" + b",".join(encode(r) for r in responses) + b"]", "ok")
+
+
+def artifact_event(rpc_id, task_id, text: str, append: bool, last_chunk: bool) -> dict:
+    """`tasks/sendSubscribe` TaskArtifactUpdateEvent."""
+    return {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "result": {
+            "id": task_id,
+            "artifact": text_artifact(text, append=append, last_chunk=last_chunk)
+        }
+    }
+
+
+def status_event(rpc_id, task_id, state: str, final: bool = False, metadata: Optional[dict] = None) -> dict:
+    """`tasks/sendSubscribe` TaskStatusUpdateEvent."""
+    return {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "result": {
+            "id": task_id,
+            "status": {"state": state},
+            "final": final,
+            "metadata": metadata or {}
+        }
+    }
@@ -0,0 +1,158 @@
+import bisect
+import threading
+
+from fastapi.responses import PlainTextResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labelvalues, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {value}"
+
+
+class Gauge:
+    """Value read from `fn()` at scrape time, so the hot path pays nothing.
+
+    `kind="counter"` exposes a monotonically increasing value owned elsewhere.
+    """
+
+    def __init__(self, name, help, fn, kind="gauge"):
+        self.name, self.help, self.fn, self.kind = name, help, fn, kind
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield f"{self.name} {self.fn()}"
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labelvalues -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        names = self.labelnames + ("le",)
+        for labelvalues, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, labelvalues + (bound,))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(names, labelvalues + ('+Inf',))} {series[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {series[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labelvalues)} {series[-1]}"
+
+
+class AgentMetrics:
+    """Metric families for one agent, rendered in the Prometheus text format.
+
+    Hot-path updates are a dict lookup and an increment; queue depths,
+    in-flight counts and cache counters are read from their owners only
+    when `/metrics` is scraped.
+    """
+
+    def __init__(self, service):
+        self.requests = Histogram(
+            "agent_rpc_request_duration_seconds", "JSON-RPC request latency by method and outcome.",
+            ("method", "outcome"))
+        self.upstream = Histogram(
+            "agent_upstream_duration_seconds", "Upstream inference call duration.", ("call", "outcome"))
+        self.tokens = Counter("agent_upstream_tokens_total", "Tokens reported by the provider's usage field.", ("type",))
+        self._in_flight = 0
+        self.families = [
+            self.requests,
+            self.upstream,
+            self.tokens,
+            Gauge("agent_rpc_in_flight", "JSON-RPC requests being handled.", lambda: self._in_flight),
+            Gauge("agent_upstream_client_setup_seconds", "Time spent creating the pooled upstream client.",
+                  lambda: service.upstream.setup_seconds),
+            Gauge("agent_upstream_warmup_seconds", "Time spent opening the first pooled upstream connection.",
+                  lambda: service.upstream.warmup_seconds),
+            Gauge("agent_executor_in_flight", "Blocking upstream calls running on the executor.",
+                  lambda: service.executor.in_flight),
+            Gauge("agent_executor_queued", "Upstream calls waiting for an executor worker.",
+                  lambda: service.executor.queued),
+            Gauge("agent_singleflight_coalesced_total", "Requests served by another caller's upstream call or stream.",
+                  lambda: service.flights.coalesced, kind="counter"),
+            Gauge("agent_tasks_active", "Streaming and asynchronous tasks still running.",
+                  lambda: service.tasks.active),
+            Gauge("agent_task_store_entries", "Finished tasks kept for tasks/get.", lambda: len(service.tasks)),
+            Gauge("agent_task_store_bytes", "Approximate memory held by the task store.", lambda: service.tasks.bytes),
+            Gauge("agent_sessions", "Conversations kept for multi-turn sessionIds.", lambda: len(service.sessions)),
+            Gauge("agent_session_bytes", "Approximate memory held by the conversation store.",
+                  lambda: service.sessions.bytes),
+        ]
+        if service.limiter is not None:
+            self.families += [
+                Gauge("agent_limiter_waiting", "Calls waiting for rate-limit quota.", lambda: service.limiter.waiting),
+                Gauge("agent_limiter_rejected_total", "Calls rejected with -32002.",
+                      lambda: service.limiter.rejected, kind="counter"),
+            ]
+        if service.cache is not None:
+            self.families += [
+                Gauge("agent_cache_hits_total", "Response cache hits.", lambda: service.cache.hits, kind="counter"),
+                Gauge("agent_cache_disk_hits_total", "Response cache hits served by the SQLite tier.",
+                      lambda: service.cache.disk_hits, kind="counter"),
+                Gauge("agent_cache_misses_total", "Response cache misses.",
+                      lambda: service.cache.misses, kind="counter"),
+            ]
+
+    def request_started(self):
+        self._in_flight += 1
+
+    def request_finished(self, method, outcome, seconds):
+        self._in_flight -= 1
+        self.requests.observe(seconds, method, outcome)
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        for kind in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, kind, None)
+            if value:
+                self.tokens.inc(value, kind.split("_")[0])
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+    def response(self) -> PlainTextResponse:
+        return PlainTextResponse(self.render(), media_type="text/plain; version=0.0.4")
+
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import random
+import time
+
+LIMITER_QUEUE = int(os.getenv("AGENT_LIMITER_QUEUE", "64"))
+LIMITER_MAX_WAIT = float(os.getenv("AGENT_LIMITER_MAX_WAIT", "30"))
+ESTIMATED_COMPLETION_TOKENS = int(os.getenv("AGENT_ESTIMATED_COMPLETION_TOKENS", "512"))
+
+MAX_RETRIES = int(os.getenv("AGENT_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(Exception):
+    """The limiter queue is full or the wait would pass the caller's deadline."""
+
+
+class _Bucket:
+    """Continuously refilling token bucket sized to one minute of quota."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+
+def estimate_tokens(prompt: str, max_tokens=None) -> int:
+    """Rough prompt + completion token estimate (~4 characters per token)."""
+    return len(prompt) // 4 + (max_tokens or ESTIMATED_COMPLETION_TOKENS)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets for one provider, with a bounded FIFO wait queue.
+
+    `acquire()` waits until both buckets have room. It raises
+    RateLimitExceeded instead of queueing past `max_queue` waiters or
+    waiting longer than `max_wait` seconds. `penalize()` pauses the limiter
+    after an upstream 429, e.g. for its Retry-After.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None,
+                 max_queue=LIMITER_QUEUE, max_wait=LIMITER_MAX_WAIT):
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.rejected = 0
+        self._lock = None
+
+    @classmethod
+    def from_env(cls, prefix: str, requests_per_minute=None, tokens_per_minute=None):
+        """Limiter configured by <PREFIX>_REQUESTS_PER_MINUTE / <PREFIX>_TOKENS_PER_MINUTE (0 = unlimited)."""
+        rpm = float(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", requests_per_minute or 0))
+        tpm = float(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", tokens_per_minute or 0))
+        return cls(rpm or None, tpm or None)
+
+    def _wait_time(self, tokens, now) -> float:
+        wait = max(self.blocked_until - now, 0.0)
+        if self._requests:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens:
+            wait = max(wait, self._tokens.wait_time(tokens, now))
+        return wait
+
+    async def acquire(self, tokens: int):
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise RateLimitExceeded(f"Rate limit queue is full ({self.max_queue} waiting)")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        deadline = time.monotonic() + self.max_wait
+        self.waiting += 1
+        try:
+            async with self._lock:  # one waiter at a time keeps the queue FIFO
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now)
+                    if wait <= 0:
+                        break
+                    if now + wait > deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded(f"Rate limit wait of {wait:.1f}s exceeds the queue deadline")
+                    await asyncio.sleep(wait)
+                if self._requests:
+                    self._requests.take(1, now)
+                if self._tokens:
+                    self._tokens.take(tokens, now)
+        finally:
+            self.waiting -= 1
+
+    def penalize(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def upstream_status(exc):
+    """HTTP status carried by an SDK exception (Azure, OpenAI or Groq), if any."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def retry_after(exc):
+    """Seconds from the upstream Retry-After header, if present and numeric."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt: int, hint=None) -> float:
+    """Retry-After when given, else exponential backoff; both with up to 25% jitter."""
+    base = hint if hint is not None else min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+    return base * (1 + random.uniform(0, 0.25))
@@ -0,0 +1,468 @@
+import asyncio
+import os
+import time
+from typing import Any, List
+
+from fastapi.responses import Response, StreamingResponse
+
+from agent_common.cache import cache_key
+from agent_common.jsonrpc import (
+    INFERENCE_FAILED,
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    MISSING_CREDENTIALS,
+    PARSE_ERROR,
+    RATE_LIMITED,
+    TASK_NOT_CANCELABLE,
+    TASK_NOT_FOUND,
+    InvalidRequest,
+    RpcCall,
+    artifact_event,
+    encode,
+    encode_batch,
+    encode_task_result,
+    dumps,
+    loads,
+    parse_call,
+    rpc_error,
+    status_event,
+    task_status,
+)
+from agent_common.metrics import AgentMetrics
+from agent_common.ratelimit import (
+    MAX_RETRIES,
+    RETRYABLE_STATUS,
+    RateLimitExceeded,
+    estimate_tokens,
+    retry_after,
+    retry_delay,
+    upstream_status,
+)
+from agent_common.sessions import HISTORY_TOKENS, ConversationStore, count_tokens
+from agent_common.singleflight import SingleFlight
+from agent_common.streaming import StreamUsage, sse_event, stream_in_executor
+from agent_common.tasks import CANCELED, COMPLETED, FAILED, WORKING, TaskStore, summarize
+
+BATCH_CONCURRENCY = int(os.getenv("AGENT_BATCH_CONCURRENCY", "8"))
+
+# --- Methods served by /rpc (anything else is -32601) ---
+RPC_METHODS = ("tasks/send", "tasks/sendSubscribe", "tasks/get", "tasks/cancel")
+
+
+class _EventStream:
+    """Body of one `tasks/sendSubscribe` response: its SSE events, plus the cleanup of its task.
+
+    `release()` runs exactly once however the stream ends: after the last
+    event, when the client goes away mid-stream, or when the server closes
+    or drops the body before the first event (when the generator's own
+    `finally` never runs). It cancels the task if it is still running and
+    records the request metric.
+    """
+
+    def __init__(self, service, call: RpcCall, task):
+        self.service = service
+        self.call = call
+        self.task = task
+        self.started = time.perf_counter()
+        self.outcome = "canceled"
+        self._released = False
+        self._events = None  # created on the first event, so an unread body holds no reference cycle
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        if self._events is None:
+            self._events = self.service._events(self.call, self.task, self)
+        return self._events.__anext__()
+
+    async def aclose(self):
+        try:
+            if self._events is not None:
+                await self._events.aclose()
+        finally:
+            self.release()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        if not self.task.final:
+            self.service.tasks.cancel(self.task)
+        self.service.metrics.request_finished("tasks/sendSubscribe", self.outcome, time.perf_counter() - self.started)
+
+    def __del__(self):
+        self.release()
+
+
+class AgentService:
+    """The `/rpc` methods of one agent, built on its blocking SDK calls.
+
+    `infer(user_query, history)` returns the provider's chat completion and
+    `stream(user_query, history)` yields text deltas; both run on `executor`.
+    `history` is the ((question, answer), ...) of earlier turns in the
+    request's `sessionId`, trimmed to `history_tokens` (by default the
+    model's `max_tokens`, else AGENT_HISTORY_TOKENS).
+    When `missing_credential` is set, requests are rejected with -32001 and
+    that message while `upstream` has no credential.
+    With a `cache`, answers are keyed on the query, `model` and `sampling`;
+    callers can bypass it with `"noCache": true` in the task metadata.
+    Concurrent identical requests share one upstream call; streams that
+    join a running one get its deltas so far, then the rest.
+    Batch arrays run up to `batch_concurrency` entries at a time.
+    With a `limiter`, every upstream call first waits for quota; upstream
+    429/5xx responses are retried up to `max_retries` times, honoring
+    Retry-After (streams only until their first delta). Quota waits that
+    would pass the limiter's deadline fail fast with -32002.
+
+    `/rpc` bodies are decoded and validated in a single pass (`parse_call`)
+    and `tasks/send` answers are written into a prebuilt byte envelope, so the
+    route hands raw bytes in and gets a ready `Response` back.
+
+    Finished answers are kept in a bounded `TaskStore` for `tasks/get`. With
+    `"summary": true` in the task metadata, `tasks/send` returns only the
+    first words of the answer and the client fetches the rest on demand.
+
+    With `"async": true`, `tasks/send` returns a `submitted` task at once and
+    the answer is produced in the background; `tasks/get` polls it and
+    `tasks/cancel` stops it. Streams (`tasks/sendSubscribe`) are tracked
+    the same way. Cancelling, or the client going away, stops the upstream
+    stream once no other caller shares it. Plain `tasks/send` calls may be shared with other callers, so
+    they are not cancellable.
+    """
+
+    def __init__(self, upstream, executor, infer, stream, error_prefix, missing_credential=None,
+                 model="", sampling=None, cache=None, batch_concurrency=BATCH_CONCURRENCY,
+                 limiter=None, max_retries=MAX_RETRIES, tasks=None, sessions=None, history_tokens=None):
+        self.upstream = upstream
+        self.executor = executor
+        self.infer = infer
+        self.stream = stream
+        self.error_prefix = error_prefix
+        self.missing_credential = missing_credential
+        self.model = model
+        self.sampling = sampling or {}
+        self.cache = cache
+        self.flights = SingleFlight()
+        self.batch_concurrency = batch_concurrency
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.tasks = tasks if tasks is not None else TaskStore()
+        self.sessions = sessions if sessions is not None else ConversationStore()
+        self.history_tokens = history_tokens or self.sampling.get("max_tokens") or HISTORY_TOKENS
+        self.metrics = AgentMetrics(self)
+
+    async def dispatch(self, body: bytes):
+        """Entry point for `/rpc`: the raw body of a single request or a batch array."""
+        started = time.perf_counter()
+        self.metrics.request_started()
+        method, outcome = "unknown", "error"
+        try:
+            try:
+                decoded = loads(body)
+            except ValueError:
+                return self._reply(encode(rpc_error(None, PARSE_ERROR, "Parse error")))
+            if isinstance(decoded, list):
+                method = "batch"
+                response = await self.handle_batch(decoded)
+            else:
+                method = decoded.get("method") if isinstance(decoded, dict) else None
+                method = method if method in RPC_METHODS else "unknown"
+                response = await self.handle(decoded)
+            if isinstance(response, StreamingResponse):
+                method = None  # recorded by _EventStream once the stream ends
+                return response
+            response = encode(response)
+            outcome = response.outcome
+            return self._reply(response)
+        finally:
+            if method is not None:
+                self.metrics.request_finished(method, outcome, time.perf_counter() - started)
+
+    @staticmethod
+    def _reply(encoded: bytes) -> Response:
+        return Response(content=encoded, media_type="application/json")
+
+    def ready_response(self) -> Response:
+        """`/ready`: 200 once the upstream client is configured and built (and warmed up) without error, else 503."""
+        status = self.upstream.status()
+        return Response(content=dumps(status), status_code=200 if status["ready"] else 503,
+                        media_type="application/json")
+
+    async def handle_batch(self, entries: List[Any]):
+        if not entries:
+            return rpc_error(None, INVALID_REQUEST, "Invalid Request: empty batch")
+
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def run_entry(entry):
+            try:
+                call = parse_call(entry)
+            except InvalidRequest as e:
+                return rpc_error(e.rpc_id, INVALID_REQUEST, "Invalid Request")
+            if call.method == "tasks/sendSubscribe":
+                return rpc_error(call.id, INVALID_REQUEST, "tasks/sendSubscribe cannot be batched")
+            async with semaphore:
+                return await self.route(call)
+
+        return encode_batch(await asyncio.gather(*(run_entry(entry) for entry in entries)))
+
+    async def handle(self, obj):
+        """Validate one decoded request object and run it."""
+        try:
+            call = parse_call(obj)
+        except InvalidRequest as e:
+            return rpc_error(e.rpc_id, INVALID_REQUEST, "Invalid Request")
+        return await self.route(call)
+
+    async def route(self, call: RpcCall):
+        if call.method == "tasks/send":
+            return await self.send(call)
+        if call.method == "tasks/sendSubscribe":
+            return await self.send_subscribe(call)
+        if call.method == "tasks/get":
+            return self.get_task(call)
+        if call.method == "tasks/cancel":
+            return self.cancel_task(call)
+        return rpc_error(call.id, METHOD_NOT_FOUND, "Method not found")
+
+    def _validate(self, call: RpcCall):
+        """Return an error response, or None when the call can be served."""
+        if not call.user_query:
+            return rpc_error(call.id, INVALID_PARAMS, "No valid text part found in message")
+        if self.missing_credential and not self.upstream.configured:
+            return rpc_error(call.id, MISSING_CREDENTIALS, self.missing_credential)
+        return None
+
+    def _use_cache(self, call: RpcCall) -> bool:
+        return self.cache is not None and self.cache.enabled and not call.metadata.get("noCache")
+
+    def _history(self, call: RpcCall) -> tuple:
+        return self.sessions.history(call.session_id, self.history_tokens)
+
+    async def send(self, call: RpcCall):
+        error = self._validate(call)
+        if error:
+            return error
+
+        history = self._history(call)
+        key = cache_key(call.user_query, self.model, self.sampling, history)
+        use_cache = self._use_cache(call)
+        if use_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return self._result(call, cached, {"cached": True})
+
+        if call.metadata.get("async"):
+            return self._submit(call, key, history)
+
+        try:
+            answer = await self.flights.do(key, self._infer_and_store, key, call.user_query, history)
+        except Exception as e:
+            return self._failure(call.id, e)
+
+        return self._result(call, answer)
+
+    def _result(self, call: RpcCall, answer: str, metadata=None):
+        """Record the turn and the answer for tasks/get, then encode the reply (summary only if asked)."""
+        self.tasks.put(call.task_id, answer)
+        self.sessions.append(call.session_id, call.user_query, answer)
+        if call.metadata.get("summary"):
+            answer, truncated = summarize(answer)
+            metadata = dict(metadata or {}, summary=True, truncated=truncated)
+        return encode_task_result(call.id, call.task_id, answer, metadata, call.session_id)
+
+    def _submit(self, call: RpcCall, key, history):
+        """Start a background task and return it in the `submitted` state."""
+        if call.task_id is None:
+            return rpc_error(call.id, INVALID_PARAMS, "Asynchronous tasks need params.id")
+        task = self.tasks.begin(call.task_id)
+        if task is None:
+            return rpc_error(call.id, INVALID_PARAMS, "Task id is already running")
+        task.job = asyncio.ensure_future(self._produce(task, call, key, history))
+        return task_status(call.id, task.id, task.state, session_id=call.session_id)
+
+    def get_task(self, call: RpcCall):
+        task = self.tasks.get(call.task_id)
+        if task is None:
+            return rpc_error(call.id, TASK_NOT_FOUND, "Task not found")
+        if task.state == COMPLETED:
+            return encode_task_result(call.id, task.id, task.text)
+        return task_status(call.id, task.id, task.state, task.error)
+
+    def cancel_task(self, call: RpcCall):
+        task = self.tasks.get(call.task_id)
+        if task is None:
+            return rpc_error(call.id, TASK_NOT_FOUND, "Task not found")
+        if task.final:
+            return rpc_error(call.id, TASK_NOT_CANCELABLE, f"Task is already {task.state}")
+        self.tasks.cancel(task)
+        return task_status(call.id, task.id, task.state)
+
+    def _failure(self, rpc_id, exc: Exception) -> dict:
+        if isinstance(exc, RateLimitExceeded):
+            return rpc_error(rpc_id, RATE_LIMITED, f"{self.error_prefix}: {str(exc)}")
+        if upstream_status(exc) == 429:
+            return rpc_error(rpc_id, RATE_LIMITED, f"{self.error_prefix}: upstream rate limit: {str(exc)}")
+        return rpc_error(rpc_id, INFERENCE_FAILED, f"{self.error_prefix}: {str(exc)}")
+
+    async def _acquire(self, user_query: str, history=()):
+        if self.limiter is not None:
+            tokens = estimate_tokens(user_query, self.sampling.get("max_tokens"))
+            tokens += sum(count_tokens(question) + count_tokens(answer) for question, answer in history)
+            await self.limiter.acquire(tokens)
+
+    async def _call_upstream(self, user_query: str, history=()) -> str:
+        """Rate-limited blocking inference with jittered retries on 429/5xx."""
+        attempt = 0
+        while True:
+            await self._acquire(user_query, history)
+            started = time.perf_counter()
+            try:
+                response = await self.executor.run(self.infer, user_query, history)
+                self.metrics.upstream.observe(time.perf_counter() - started, "infer", "ok")
+                self.metrics.record_usage(getattr(response, "usage", None))
+                return response.choices[0].message.content
+            except Exception as e:
+                self.metrics.upstream.observe(time.perf_counter() - started, "infer", "error")
+                status = upstream_status(e)
+                if status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    raise
+                delay = retry_delay(attempt, retry_after(e))
+                attempt += 1
+            await self._back_off(status, delay)
+
+    async def _back_off(self, status, delay: float):
+        if status == 429 and self.limiter is not None:
+            self.limiter.penalize(delay)  # the next acquire() waits it out
+        else:
+            await asyncio.sleep(delay)
+
+    async def _infer_and_store(self, key: str, user_query: str, history=()) -> str:
+        answer = await self._call_upstream(user_query, history)
+        if self.cache is not None:
+            await self.cache.put(key, answer)
+        return answer
+
+    async def _stream_upstream(self, publish, key: str, user_query: str, history=()):
+        """Rate-limited upstream stream, publishing each delta; the answer is cached at the end.
+
+        Opening the stream is retried like `_call_upstream` (429/5xx, with
+        Retry-After), but only until the first delta has been published.
+        """
+        chunks = []
+        attempt = 0
+        while True:
+            await self._acquire(user_query, history)
+            started = time.perf_counter()
+            usage = None
+            try:
+                async for delta in stream_in_executor(self.executor, self.stream, user_query, history):
+                    if isinstance(delta, StreamUsage):
+                        usage = delta.usage
+                        continue
+                    chunks.append(delta)
+                    publish(delta)
+                self.metrics.upstream.observe(time.perf_counter() - started, "stream", "ok")
+                break
+            except asyncio.CancelledError:
+                self.metrics.upstream.observe(time.perf_counter() - started, "stream", "canceled")
+                raise
+            except Exception as e:
+                self.metrics.upstream.observe(time.perf_counter() - started, "stream", "error")
+                status = upstream_status(e)
+                if chunks or status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    raise
+                delay = retry_delay(attempt, retry_after(e))
+                attempt += 1
+            finally:
+                self.metrics.record_usage(usage)
+            await self._back_off(status, delay)
+
+        if self.cache is not None:
+            await self.cache.put(key, "".join(chunks))
+
+    async def _produce(self, task, call: RpcCall, key: str, history, deltas=None):
+        """Stream one answer into `task` (and `deltas`, if given), recording its final state.
+
+        The upstream stream is shared with concurrent identical requests.
+        """
+        task.state = WORKING
+        chunks = []
+        try:
+            async for delta in self.flights.stream(key, self._stream_upstream, key, call.user_query, history):
+                chunks.append(delta)
+                if deltas is not None:
+                    deltas.put_nowait(delta)
+        except asyncio.CancelledError:
+            self.tasks.finish(task, CANCELED)
+            raise
+        except Exception as e:
+            self.tasks.finish(task, FAILED, error=self._failure(None, e)["error"])
+            return
+
+        answer = "".join(chunks)
+        self.sessions.append(call.session_id, call.user_query, answer)
+        self.tasks.finish(task, COMPLETED, answer)
+
+    async def send_subscribe(self, call: RpcCall):
+        error = self._validate(call)
+        if error:
+            return error
+        task = self.tasks.begin(call.task_id)
+        if task is None:
+            return rpc_error(call.id, INVALID_PARAMS, "Task id is already running")
+
+        return StreamingResponse(
+            _EventStream(self, call, task),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def _events(self, call: RpcCall, task, stream: _EventStream):
+        """SSE events of one stream; `stream.outcome` is the request metric's outcome so far."""
+        rpc_id, task_id, user_query = call.id, call.task_id, call.user_query
+        try:
+            yield sse_event(status_event(rpc_id, task_id, "working"))
+
+            history = self._history(call)
+            key = cache_key(user_query, self.model, self.sampling, history)
+            cached = await self.cache.get(key) if self._use_cache(call) else None
+            if cached is not None:
+                stream.outcome = "cached"
+                self.sessions.append(call.session_id, user_query, cached)
+                self.tasks.finish(task, COMPLETED, cached)
+                yield sse_event(artifact_event(rpc_id, task_id, cached, append=False, last_chunk=True))
+                yield sse_event(status_event(rpc_id, task_id, "completed", final=True, metadata={"cached": True}))
+                return
+
+            # The upstream stream runs as the task's job, so tasks/cancel can stop it;
+            # so does the client going away (the finally below).
+            deltas = asyncio.Queue()
+            task.job = job = asyncio.ensure_future(self._produce(task, call, key, history, deltas))
+            job.add_done_callback(lambda _: deltas.put_nowait(None))
+            appended = False
+            try:
+                while True:
+                    delta = await deltas.get()
+                    if delta is None:
+                        break
+                    yield sse_event(artifact_event(rpc_id, task_id, delta, append=appended, last_chunk=False))
+                    appended = True
+            finally:
+                if not job.done():
+                    self.tasks.cancel(task)
+
+            if task.state == FAILED:
+                stream.outcome = "error"
+                yield sse_event(rpc_error(rpc_id, task.error["code"], task.error["message"]))
+                yield sse_event(status_event(rpc_id, task_id, "failed", final=True))
+            elif task.state == CANCELED:
+                yield sse_event(status_event(rpc_id, task_id, "canceled", final=True))
+            else:
+                stream.outcome = "ok"
+                yield sse_event(artifact_event(rpc_id, task_id, "", append=appended, last_chunk=True))
+                yield sse_event(status_event(rpc_id, task_id, "completed", final=True))
+        finally:
+            stream.release()
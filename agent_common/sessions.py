@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+SESSION_LIMIT = int(os.getenv("AGENT_SESSION_LIMIT", "1000"))
+SESSION_TTL = float(os.getenv("AGENT_SESSION_TTL", "1800"))
+SESSION_BYTES = int(os.getenv("AGENT_SESSION_BYTES", str(16 * 1024 * 1024)))
+SESSION_MAX_TURNS = int(os.getenv("AGENT_SESSION_MAX_TURNS", "20"))
+HISTORY_TOKENS = int(os.getenv("AGENT_HISTORY_TOKENS", "1024"))
+
+_TURN_OVERHEAD = 120  # rough bytes per turn besides its two strings
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count, the same ~4 characters per token as the rate limiter."""
+    return len(text) // 4 + 1
+
+
+class _Session:
+    __slots__ = ("turns", "bytes", "expires")
+
+    def __init__(self):
+        self.turns = deque()  # (question, answer, tokens, size), oldest first
+        self.bytes = 0
+        self.expires = 0.0
+
+
+class ConversationStore:
+    """Turns of each `sessionId`, for multi-turn conversations.
+
+    A turn is just the question, the answer and their token estimate.
+    Sessions keep their last `max_turns` turns and expire `ttl` seconds
+    after their last use; the least recently used ones are evicted first
+    once there are more than `max_sessions` or they hold more than
+    `max_bytes` in total.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_LIMIT, max_bytes: int = SESSION_BYTES,
+                 ttl: float = SESSION_TTL, max_turns: int = SESSION_MAX_TURNS):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._sessions = OrderedDict()  # session id -> _Session, least recently used first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def history(self, session_id, budget: int) -> tuple:
+        """((question, answer), ...) of the latest turns that fit in `budget` tokens, oldest first."""
+        if session_id is None or budget <= 0:
+            return ()
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return ()
+            if session.expires <= now:
+                self._discard(session_id)
+                return ()
+            session.expires = now + self.ttl
+            self._sessions.move_to_end(session_id)
+            picked = []
+            for question, answer, tokens, _ in reversed(session.turns):
+                if tokens > budget:
+                    break
+                budget -= tokens
+                picked.append((question, answer))
+        picked.reverse()
+        return tuple(picked)
+
+    def append(self, session_id, question: str, answer: str):
+        if session_id is None or self.max_turns <= 0:
+            return
+        size = _TURN_OVERHEAD + sys.getsizeof(question) + sys.getsizeof(answer)
+        if size > self.max_bytes:
+            return
+        turn = (question, answer, count_tokens(question) + count_tokens(answer), size)
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.expires <= now:
+                self._discard(session_id)
+                session = self._sessions[session_id] = _Session()
+            session.turns.append(turn)
+            session.bytes += size
+            self.bytes += size
+            while len(session.turns) > self.max_turns:
+                dropped = session.turns.popleft()[3]
+                session.bytes -= dropped
+                self.bytes -= dropped
+            session.expires = now + self.ttl
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def _discard(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.bytes -= session.bytes
+
+    def _evict(self, now):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if (len(self._sessions) <= self.max_sessions and self.bytes <= self.max_bytes
+                    and session.expires > now):
+                return
+            self._discard(session_id)
+            self.evicted += 1
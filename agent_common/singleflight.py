@@ -0,0 +1,97 @@
+import asyncio
+
+
+class _Broadcast:
+    """Items of one running producer, replayed to every subscriber that joins while it runs."""
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.job = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, item):
+        self.items.append(item)
+        self._wake()
+
+    def close(self, error=None):
+        self.done = True
+        self.error = error
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one upstream call.
+
+    The first caller starts the work as a task; callers arriving while it
+    runs await the same task. Results and errors go to every waiter and are
+    forgotten as soon as the task finishes, so failures are never reused.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._streams = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args):
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one caller disconnecting does not cancel the others' answer.
+        return await asyncio.shield(task)
+
+    async def stream(self, key, fn, *args):
+        """Like `do` for a producer `fn(publish, *args)` that publishes items as it goes.
+
+        A caller that joins a running producer first gets the items published
+        so far, then the rest as they come. The producer is cancelled only
+        when its last subscriber goes away.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = self._streams[key] = _Broadcast()
+            flight.job = asyncio.ensure_future(fn(flight.publish, *args))
+            flight.job.add_done_callback(lambda job: self._landed(key, flight, job))
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+        try:
+            async for item in flight.subscribe():
+                yield item
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.job.done():
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+                flight.job.cancel()
+
+    def _landed(self, key, flight, job):
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+        flight.close(asyncio.CancelledError() if job.cancelled() else job.exception())
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights) + len(self._streams)
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from agent_common.jsonrpc import dumps
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+_DONE = object()
+
+
+class StreamUsage:
+    """Token usage reported by the provider at the end of a stream."""
+
+    __slots__ = ("usage",)
+
+    def __init__(self, usage):
+        self.usage = usage
+
+
+def iter_deltas(stream):
+    """Yield the non-empty text deltas of a streamed chat completion.
+
+    Works for both the Azure AI Inference and the OpenAI/Groq stream objects,
+    and closes the upstream response when the consumer stops early. If the
+    provider reported token usage (the last chunk's `usage`, or Groq's
+    `x_groq.usage`), it follows the deltas as a `StreamUsage`.
+    """
+    usage = None
+    with stream:
+        for update in stream:
+            if update.choices and update.choices[0].delta.content:
+                yield update.choices[0].delta.content
+            usage = getattr(update, "usage", None) or getattr(getattr(update, "x_groq", None), "usage", None) or usage
+    if usage is not None:
+        yield StreamUsage(usage)
+
+
+async def stream_in_executor(executor, gen_fn, *args):
+    """Drive a blocking generator on `executor`, yielding its items on the event loop.
+
+    When the consumer goes away (the SSE client disconnects or the task is
+    cancelled) the worker stops at the next item and closes the generator,
+    which in turn closes the upstream HTTP stream. A call still waiting for
+    an executor worker never starts.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def drain():
+        if stop.is_set():
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+            return
+        gen = gen_fn(*args)
+        try:
+            for item in gen:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, _Failure(e))
+        finally:
+            gen.close()
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    worker = asyncio.ensure_future(executor.run(drain))
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+        if worker.done():
+            worker.result()
+        else:
+            worker.cancel()
+
+
+def sse_event(payload: dict) -> bytes:
+    return b"data: " + dumps(payload) + b"\n\n"
@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+TASK_STORE_SIZE = int(os.getenv("AGENT_TASK_STORE_SIZE", "1024"))
+TASK_STORE_BYTES = int(os.getenv("AGENT_TASK_STORE_BYTES", str(32 * 1024 * 1024)))
+TASK_TTL = float(os.getenv("AGENT_TASK_TTL", "900"))
+SUMMARY_WORDS = int(os.getenv("AGENT_SUMMARY_WORDS", "25"))
+
+# --- A2A task states ---
+SUBMITTED = "submitted"
+WORKING = "working"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELED = "canceled"
+FINAL_STATES = (COMPLETED, FAILED, CANCELED)
+
+_WORD = re.compile(r"\S+")
+_TASK_OVERHEAD = 256  # rough bytes per stored task besides its text
+
+
+def summarize(text: str, words: int = SUMMARY_WORDS):
+    """(first `words` words, truncated?) scanning only as far as needed."""
+    found = []
+    for match in _WORD.finditer(text):
+        if len(found) == words:
+            return " ".join(found) + "...", True
+        found.append(match.group())
+    return " ".join(found), False
+
+
+class Task:
+    """One task's state; `job` is the asyncio task producing it, while it runs."""
+
+    __slots__ = ("id", "state", "text", "error", "job", "expires", "size")
+
+    def __init__(self, task_id, state: str = SUBMITTED, text: str = None):
+        self.id = task_id
+        self.state = state
+        self.text = text
+        self.error = None  # {"code", "message"} when failed
+        self.job = None
+        self.expires = 0.0
+        self.size = 0
+
+    @property
+    def final(self) -> bool:
+        return self.state in FINAL_STATES
+
+
+class TaskStore:
+    """Running tasks plus finished ones kept for `tasks/get`.
+
+    Running tasks are never evicted. Finished ones are bounded by entry
+    count, by approximate memory (`max_bytes`) and by a sliding TTL:
+    reading a task keeps it alive, the least recently read ones go first.
+    """
+
+    def __init__(self, max_tasks: int = TASK_STORE_SIZE, max_bytes: int = TASK_STORE_BYTES, ttl: float = TASK_TTL):
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._active = {}  # task id -> Task
+        self._tasks = OrderedDict()  # task id -> finished Task, least recently read first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._tasks)
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    def begin(self, task_id):
+        """Register a new running task, or return None if that id is already running.
+
+        Tasks without an id run untracked (they cannot be polled or cancelled).
+        """
+        task = Task(task_id)
+        if task_id is None:
+            return task
+        with self._lock:
+            if task_id in self._active:
+                return None
+            self._discard(task_id)
+            self._active[task_id] = task
+        return task
+
+    def finish(self, task: Task, state: str, text: str = None, error: dict = None):
+        """Move a task to its final state; later calls for the same task are ignored."""
+        with self._lock:
+            if task.final:
+                return
+            task.state, task.text, task.error, task.job = state, text, error, None
+            if task.id is None or self._active.get(task.id) is not task:
+                return
+            del self._active[task.id]
+            self._store(task, time.monotonic())
+
+    def put(self, task_id, text: str):
+        """Record an answer produced outside a tracked job (tasks/send, cache hits)."""
+        if task_id is None:
+            return
+        with self._lock:
+            if task_id in self._active:
+                return
+            self._store(Task(task_id, COMPLETED, text), time.monotonic())
+
+    def get(self, task_id):
+        """The running or finished Task, or None when unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            task = self._active.get(task_id)
+            if task is not None:
+                return task
+            task = self._tasks.get(task_id)
+            if task is None:
+                return None
+            if task.expires <= now:
+                self._discard(task_id)
+                return None
+            task.expires = now + self.ttl
+            self._tasks.move_to_end(task_id)
+            return task
+
+    def cancel(self, task: Task):
+        """Mark a running task canceled and cancel its job (which aborts the upstream call)."""
+        job = task.job
+        self.finish(task, CANCELED)
+        if job is not None:
+            job.cancel()
+
+    def _store(self, task: Task, now: float):
+        self._discard(task.id)
+        if self.max_tasks <= 0:
+            return
+        task.size = _TASK_OVERHEAD + (sys.getsizeof(task.text) if task.text else 0)
+        if task.size > self.max_bytes:
+            return
+        task.expires = now + self.ttl
+        self._tasks[task.id] = task
+        self.bytes += task.size
+        self._evict(now)
+
+    def _discard(self, task_id):
+        task = self._tasks.pop(task_id, None)
+        if task is not None:
+            self.bytes -= task.size
+
+    def _evict(self, now):
+        while self._tasks:
+            task_id, task = next(iter(self._tasks.items()))
+            if len(self._tasks) <= self.max_tasks and self.bytes <= self.max_bytes and task.expires > now:
+                return
+            self._discard(task_id)
+            self.evicted += 1
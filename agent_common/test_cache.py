@@ -0,0 +1,54 @@
+"""Offline checks of ResponseCache's memory and SQLite tiers.
+
+    python -m pytest agent_common/test_cache.py
+"""
+import asyncio
+import threading
+
+from agent_common.cache import ResponseCache, cache_key
+
+
+def test_key_ignores_whitespace_and_case_but_not_history():
+    sampling = {"temperature": 0.7}
+    key = cache_key("What is  A2A?", "m", sampling)
+    assert key == cache_key("what is a2a?", "m", sampling)
+    assert key != cache_key("what is a2a?", "m", sampling, (("q", "a"),))
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def main():
+        cache = ResponseCache(path=path)
+        cache.start()
+        await cache.put("k", "answer")
+        cache.close()
+
+        restarted = ResponseCache(path=path)
+        restarted.start()
+        first, second = await restarted.get("k"), await restarted.get("k")
+        assert await restarted.get("other") is None
+        restarted.close()
+        return restarted, first, second
+
+    cache, first, second = asyncio.run(main())
+    assert first == second == "answer"
+    assert (cache.hits, cache.disk_hits, cache.misses) == (2, 1, 1)  # the second read came from memory
+
+
+def test_disk_io_runs_off_the_event_loop(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.db"))
+    cache.start()
+    threads = []
+    read, write = cache._read, cache._write
+    cache._read = lambda *args: threads.append(threading.current_thread()) or read(*args)
+    cache._write = lambda *args: threads.append(threading.current_thread()) or write(*args)
+
+    async def main():
+        await cache.put("k", "answer")
+        cache._memory.clear()
+        return await cache.get("k")
+
+    assert asyncio.run(main()) == "answer"
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    cache.close()
@@ -0,0 +1,157 @@
+"""Offline checks of TaskStore, SingleFlight and the tasks/sendSubscribe stream lifecycle.
+
+    python -m pytest agent_common/test_service.py
+"""
+import asyncio
+import json
+import time
+import types
+
+from agent_common.executor import InferenceExecutor
+from agent_common.service import AgentService
+from agent_common.singleflight import SingleFlight
+from agent_common.tasks import CANCELED, COMPLETED, SUBMITTED, TaskStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def subscribe_body(task_id, text="hello"):
+    return json.dumps({
+        "jsonrpc": "2.0", "id": task_id, "method": "tasks/sendSubscribe",
+        "params": {"id": task_id, "message": {"role": "user", "parts": [{"type": "text", "text": text}]}},
+    }).encode()
+
+
+def agent(deltas=("Hello", " world")):
+    """AgentService over a fake upstream whose stream yields `deltas`."""
+    def stream(user_query, history=()):
+        yield from deltas
+
+    upstream = types.SimpleNamespace(configured=True)
+    return AgentService(upstream, InferenceExecutor(2, name="test"), None, stream, "Test inference failed")
+
+
+# --- TaskStore ---
+
+def test_running_task_id_cannot_be_reused_until_finished():
+    store = TaskStore()
+    task = store.begin("t1")
+    assert store.begin("t1") is None
+    store.finish(task, COMPLETED, "answer")
+    assert store.get("t1").text == "answer"
+    assert store.begin("t1") is not None
+
+
+def test_finished_tasks_are_bounded_but_running_ones_are_kept():
+    store = TaskStore(max_tasks=2)
+    running = store.begin("running")
+    for i in range(4):
+        store.finish(store.begin(f"done-{i}"), COMPLETED, "x")
+    assert len(store) == 2 and store.evicted == 2
+    assert store.get("done-0") is None
+    assert store.get("running") is running
+
+
+def test_finished_tasks_expire_after_ttl():
+    store = TaskStore(ttl=0.01)
+    store.put("t1", "answer")
+    time.sleep(0.02)
+    assert store.get("t1") is None
+
+
+# --- SingleFlight ---
+
+def test_do_shares_one_call():
+    calls = []
+
+    async def work(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x * 2
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", work, 21) for _ in range(3)))
+        return results, flights
+
+    results, flights = run(main())
+    assert results == [42, 42, 42] and calls == [21] and flights.coalesced == 2 and flights.in_flight == 0
+
+
+def test_stream_late_joiner_replays_earlier_items():
+    async def produce(publish):
+        for item in "abc":
+            publish(item)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        flights = SingleFlight()
+        first = flights.stream("k", produce)
+        got = [await first.__anext__()]
+        late = [item async for item in flights.stream("k", produce)]
+        got += [item async for item in first]
+        return got, late, flights
+
+    got, late, flights = run(main())
+    assert got == late == list("abc") and flights.coalesced == 1 and flights.in_flight == 0
+
+
+# --- tasks/sendSubscribe ---
+
+async def events(body):
+    return [chunk async for chunk in body]
+
+
+def test_stream_finishes_task_and_request_metric():
+    async def main():
+        service = agent()
+        response = await service.dispatch(subscribe_body("t1"))
+        chunks = await events(response.body_iterator)
+        return service, chunks
+
+    service, chunks = run(main())
+    assert b'"completed"' in chunks[-1]
+    assert service.tasks.get("t1").state == COMPLETED
+    assert service.tasks.active == 0 and service.metrics._in_flight == 0
+
+
+def test_stream_closed_before_first_event_releases_task():
+    async def main():
+        service = agent()
+        response = await service.dispatch(subscribe_body("t1"))
+        assert service.tasks.get("t1").state == SUBMITTED
+        await response.body_iterator.aclose()
+        return service
+
+    service = run(main())
+    assert service.tasks.get("t1").state == CANCELED
+    assert service.tasks.active == 0 and service.metrics._in_flight == 0
+    assert service.tasks.begin("t1") is not None  # the id can be used again
+
+
+def test_stream_closed_at_working_event_releases_task():
+    async def main():
+        service = agent()
+        response = await service.dispatch(subscribe_body("t1"))
+        first = await response.body_iterator.__anext__()
+        await response.body_iterator.aclose()
+        return service, first
+
+    service, first = run(main())
+    assert b'"working"' in first
+    assert service.tasks.get("t1").state == CANCELED
+    assert service.tasks.active == 0 and service.metrics._in_flight == 0
+
+
+def test_stream_dropped_without_close_releases_task():
+    async def main():
+        service = agent()
+        response = await service.dispatch(subscribe_body("t1"))
+        del response  # never iterated, never closed
+        return service
+
+    service = run(main())
+    assert service.tasks.get("t1").state == CANCELED
+    assert service.tasks.active == 0 and service.metrics._in_flight == 0
@@ -1,118 +1,86 @@
 import os
-import json
+import sys
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Any, Dict, Literal
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-from starlette.concurrency import run_in_threadpool
+from fastapi import APIRouter, FastAPI, Request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from agent_common import (
+    AgentCard,
+    AgentService,
+    InferenceExecutor,
+    RateLimiter,
+    ResponseCache,
+    SharedClient,
+    agent_lifespan,
+    create_github_models_client,
+    iter_deltas,
+)
 
 # --- Load environment variables ---
 load_dotenv()
 
-app = FastAPI(title="DeepSeek QA Agent via Azure Inference")
+# --- Model info and the process-wide pooled client ---
+model = "deepseek/DeepSeek-V3-0324"
+sampling = dict(temperature=1.0, top_p=1.0, max_tokens=1000)
+token = os.getenv("GITHUB_TOKEN", "")
+upstream = SharedClient.shared(create_github_models_client, token)
+executor = InferenceExecutor(name="deepseek")
+limiter = RateLimiter.from_env("DEEPSEEK", requests_per_minute=10)
+cache = ResponseCache.shared()
+card = AgentCard(os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_cards/deepseek_card.json"))
 
-# --- Serve the Agent Card ---
-@app.get("/.well-known/agent.json")
-async def agent_card():
-    try:
-        with open("agent_cards/deepseek_card.json", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        return {"error": f"Failed to load agent card: {str(e)}"}
+title = "DeepSeek QA Agent via Azure Inference"
+resources = (card, upstream, executor, cache)
+router = APIRouter()
 
-# --- JSON-RPC 2.0 request model ---
-class JsonRpcRequest(BaseModel):
-    jsonrpc: Literal["2.0"]
-    id: str
-    method: str
-    params: Dict[str, Any]
+# --- Serve the Agent Card (loaded once at startup, ETag-validated) ---
+@router.get("/.well-known/agent.json")
+async def agent_card(request: Request):
+    return card.response(request)
 
-# --- Synchronous inference call wrapped in a threadpool ---
-def sync_infer(user_query: str, token: str) -> str:
-    endpoint = "https://models.github.ai/inference"
-    model = "deepseek/DeepSeek-V3-0324"
-    token = ""
+# --- Upstream request, shared by the blocking and streaming calls ---
+def completion_kwargs(user_query: str, history=()) -> dict:
+    from azure.ai.inference.models import AssistantMessage, SystemMessage, UserMessage  # deferred: keeps the SDK out of import time
 
-    client = ChatCompletionsClient(
-        endpoint=endpoint,
-        credential=AzureKeyCredential(token),
+    messages = [SystemMessage("You are a helpful assistant.")]
+    for question, answer in history:  # earlier turns of the session, oldest first
+        messages += [UserMessage(question), AssistantMessage(answer)]
+    messages.append(UserMessage(user_query))
+    return dict(
+        messages=messages,
+        model=model,
+        **sampling
     )
 
-    response = client.complete(
-        messages=[
-            SystemMessage("You are a helpful assistant."),
-            UserMessage(user_query),
-        ],
-        temperature=1.0,
-        top_p=1.0,
-        max_tokens=1000,
-        model=model
-    )
-    return response.choices[0].message.content
+# --- Synchronous inference calls, run on the bounded executor ---
+def sync_infer(user_query: str, history=()):
+    return upstream.get().complete(**completion_kwargs(user_query, history))
 
-# --- RPC handler ---
-@app.post("/rpc")
-async def rpc_handler(rpc_req: JsonRpcRequest):
-    if rpc_req.method != "tasks/send":
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32601, "message": "Method not found"}
-        }
+def sync_stream(user_query: str, history=()):
+    yield from iter_deltas(upstream.get().complete(stream=True, **completion_kwargs(user_query, history)))
 
-    # Extract user query
-    message = rpc_req.params.get("message", {})
-    user_query = ""
-    for part in message.get("parts", []):
-        if part.get("type") == "text":
-            user_query = part.get("text", "")
-            break
+service = AgentService(
+    upstream, executor, sync_infer, sync_stream, "Model inference failed",
+    missing_credential="Missing GITHUB_TOKEN in environment variables",
+    model=model, sampling=sampling, cache=cache,
+    limiter=limiter,
+)
 
-    if not user_query:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32602, "message": "No valid text part found in message"}
-        }
+# --- Prometheus metrics ---
+@router.get("/metrics")
+async def metrics():
+    return service.metrics.response()
 
-    token = ""
-    if not token:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32001, "message": "Missing GITHUB_TOKEN in environment variables"}
-        }
+# --- Readiness: 200 once the upstream client is built (and warmed up with AGENT_WARMUP) ---
+@router.get("/ready")
+async def ready():
+    return service.ready_response()
 
-    try:
-        # Run blocking call in a threadpool
-        answer_content = await run_in_threadpool(sync_infer, user_query, token)
-    except Exception as e:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32000, "message": f"Model inference failed: {str(e)}"}
-        }
+# --- RPC handler (tasks/send, tasks/sendSubscribe, batches) ---
+@router.post("/rpc")
+async def rpc_handler(request: Request):
+    return await service.dispatch(await request.body())
 
-    return {
-        "jsonrpc": "2.0",
-        "id": rpc_req.id,
-        "result": {
-            "id": rpc_req.params.get("id"),
-            "sessionId": None,
-            "status": {"state": "completed"},
-            "artifacts": [
-                {
-                    "parts": [
-                        {"type": "text", "text": {"raw": answer_content}}
-                    ],
-                    "index": 0,
-                    "append": False,
-                    "lastChunk": True
-                }
-            ],
-            "metadata": {}
-        }
-    }
+# --- Standalone app (one agent per port); gateway/main.py mounts `router` instead ---
+app = FastAPI(title=title, lifespan=agent_lifespan(*resources))
+app.include_router(router)
@@ -1,98 +1,87 @@
 import os
-import json
+import sys
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Any, Dict, Literal
-from openai import OpenAI
+from fastapi import APIRouter, FastAPI, Request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from agent_common import (
+    AgentCard,
+    AgentService,
+    InferenceExecutor,
+    RateLimiter,
+    ResponseCache,
+    SharedClient,
+    agent_lifespan,
+    create_openrouter_client,
+    iter_deltas,
+)
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Google Gemma QA Agent via OpenRouter")
+# OpenRouter API key; when missing, /rpc answers -32001 instead of the import failing
+api_key = os.getenv("OPENROUTER_API_KEY", "")
 
-# Initialize OpenRouter API
-api_key = os.getenv("OPENROUTER_API_KEY")
-if not api_key:
-    raise ValueError("OPENROUTER_API_KEY not found in .env")
+model = "google/gemma-3-27b-it:free"
+upstream = SharedClient.shared(create_openrouter_client, api_key)
+executor = InferenceExecutor(name="gemma")
+limiter = RateLimiter.from_env("OPENROUTER", requests_per_minute=20)
+cache = ResponseCache.shared()
+card = AgentCard(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../agent_openAI/agent_cards/google_gemma_card.json"))
 
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=api_key,
-)
+title = "Google Gemma QA Agent via OpenRouter"
+resources = (card, upstream, executor, cache)
+router = APIRouter()
 
-@app.get("/.well-known/agent.json")
-async def agent_card():
-    """Serve the agent card JSON for Google Gemma."""
-    try:
-        with open("../agent_openAi/agent_cards/google_gemma_card.json", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        return {"error": f"Failed to load agent card: {str(e)}"}
+@router.get("/.well-known/agent.json")
+async def agent_card(request: Request):
+    """Serve the agent card JSON for Google Gemma (loaded once, ETag-validated)."""
+    return card.response(request)
 
-class JsonRpcRequest(BaseModel):
-    jsonrpc: Literal["2.0"]
-    id: str
-    method: str
-    params: Dict[str, Any]
+def completion_kwargs(user_query: str, history=()) -> dict:
+    """OpenRouter request, shared by the blocking and streaming calls.
 
-@app.post("/rpc")
-async def rpc_handler(rpc_req: JsonRpcRequest):
-    """Handle JSON-RPC requests for Google Gemma."""
-    if rpc_req.method != "tasks/send":
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32601, "message": "Method not found"}
-        }
+    `history` holds the session's earlier (question, answer) turns, oldest first.
+    """
+    messages = []
+    for question, answer in history:
+        messages += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+    messages.append({"role": "user", "content": user_query})
+    return dict(
+        model=model,
+        messages=messages
+    )
 
-    message = rpc_req.params.get("message", {})
-    user_query = ""
-    for part in message.get("parts", []):
-        if part.get("type") == "text":
-            user_query = part.get("text", "")
-            break
+def sync_infer(user_query: str, history=()):
+    """Blocking OpenRouter call, run on the bounded executor."""
+    return upstream.get().chat.completions.create(**completion_kwargs(user_query, history))
+
+def sync_stream(user_query: str, history=()):
+    """Streaming OpenRouter call yielding text deltas."""
+    yield from iter_deltas(upstream.get().chat.completions.create(stream=True, **completion_kwargs(user_query, history)))
+
+service = AgentService(
+    upstream, executor, sync_infer, sync_stream, "Inference call failed",
+    missing_credential="Missing OPENROUTER_API_KEY in environment variables",
+    model=model, cache=cache,
+    limiter=limiter,
+)
 
-    if not user_query:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32602, "message": "No valid text part found in message"}
-        }
+@router.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this agent."""
+    return service.metrics.response()
 
-    try:
-        response = client.chat.completions.create(
-            model="google/gemma-3-27b-it:free",
-            messages=[
-                {"role": "user", "content": user_query}
-            ]
-        )
-        answer_text = response.choices[0].message.content
+@router.get("/ready")
+async def ready():
+    """Readiness: 200 once the OpenRouter client is built (and warmed up with AGENT_WARMUP)."""
+    return service.ready_response()
 
-    except Exception as e:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32000, "message": f"Inference call failed: {str(e)}"}
-        }
+@router.post("/rpc")
+async def rpc_handler(request: Request):
+    """Handle JSON-RPC requests (tasks/send, tasks/sendSubscribe, batches) for Google Gemma."""
+    return await service.dispatch(await request.body())
 
-    return {
-        "jsonrpc": "2.0",
-        "id": rpc_req.id,
-        "result": {
-            "id": rpc_req.params.get("id"),
-            "sessionId": None,
-            "status": {"state": "completed"},
-            "artifacts": [
-                {
-                    "parts": [
-                        {"type": "text", "text": {"raw": answer_text}}
-                    ],
-                    "index": 0,
-                    "append": False,
-                    "lastChunk": True
-                }
-            ],
-            "metadata": {}
-        }
-    }
+# --- Standalone app (one agent per port); gateway/main.py mounts `router` instead ---
+app = FastAPI(title=title, lifespan=agent_lifespan(*resources))
+app.include_router(router)
@@ -1,101 +1,84 @@
 import os
-import json
+import sys
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Any, Dict, Literal
-from groq import Groq
+from fastapi import APIRouter, FastAPI, Request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from agent_common import (
+    AgentCard,
+    AgentService,
+    InferenceExecutor,
+    RateLimiter,
+    ResponseCache,
+    SharedClient,
+    agent_lifespan,
+    create_groq_client,
+    iter_deltas,
+)
 
 # --- Load environment variables ---
 load_dotenv()
 
-app = FastAPI(title="Groq Chat Agent")
+# --- Model info and one pooled Groq client per process ---
+model = "llama3-70b-8192"  # Or another available Groq model
+sampling = dict(temperature=0.7, top_p=1.0)
+groq_key = os.getenv("GROQ_API_KEY")
+upstream = SharedClient.shared(create_groq_client, groq_key)
+executor = InferenceExecutor(name="groq")
+limiter = RateLimiter.from_env("GROQ", requests_per_minute=30, tokens_per_minute=6000)
+cache = ResponseCache.shared()
+card = AgentCard(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../agent_openAI/agent_cards/groq_card.json"))
+
+title = "Groq Chat Agent"
+resources = (card, upstream, executor, cache)
+router = APIRouter()
+
+# --- Serve the Agent Card (loaded once at startup, ETag-validated) ---
+@router.get("/.well-known/agent.json")
+async def agent_card(request: Request):
+    return card.response(request)
 
-# --- Serve the Agent Card ---
-@app.get("/.well-known/agent.json")
-async def agent_card():
-    try:
-        with open("../agent_openAi/agent_cards/groq_card.json", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        return {"error": f"Failed to load agent card: {str(e)}"}
+# --- Groq request, shared by the blocking and streaming calls ---
+def completion_kwargs(user_query: str, history=()) -> dict:
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for question, answer in history:  # earlier turns of the session, oldest first
+        messages += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+    messages.append({"role": "user", "content": user_query})
+    return dict(
+        model=model,
+        messages=messages,
+        **sampling
+    )
 
-# --- JSON-RPC 2.0 request model ---
-class JsonRpcRequest(BaseModel):
-    jsonrpc: Literal["2.0"]
-    id: str
-    method: str
-    params: Dict[str, Any]
+# --- Blocking Groq calls, run on the bounded executor ---
+def sync_infer(user_query: str, history=()):
+    return upstream.get().chat.completions.create(**completion_kwargs(user_query, history))
 
-# --- RPC handler ---
-@app.post("/rpc")
-async def rpc_handler(rpc_req: JsonRpcRequest):
-    if rpc_req.method != "tasks/send":
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32601, "message": "Method not found"}
-        }
+def sync_stream(user_query: str, history=()):
+    yield from iter_deltas(upstream.get().chat.completions.create(stream=True, **completion_kwargs(user_query, history)))
 
-    # Extract user query
-    message = rpc_req.params.get("message", {})
-    user_query = ""
-    for part in message.get("parts", []):
-        if part.get("type") == "text":
-            user_query = part.get("text", "")
-            break
+service = AgentService(
+    upstream, executor, sync_infer, sync_stream, "Groq inference failed",
+    missing_credential="Missing GROQ_API_KEY in environment variables",
+    model=model, sampling=sampling, cache=cache,
+    limiter=limiter,
+)
 
-    if not user_query:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32602, "message": "No valid text part found in message"}
-        }
+# --- Prometheus metrics ---
+@router.get("/metrics")
+async def metrics():
+    return service.metrics.response()
 
-    groq_key = os.getenv("GROQ_API_KEY")
-    if not groq_key:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32001, "message": "Missing GROQ_API_KEY in environment variables"}
-        }
+# --- Readiness: 200 once the upstream client is built (and warmed up with AGENT_WARMUP) ---
+@router.get("/ready")
+async def ready():
+    return service.ready_response()
 
-    try:
-        client = Groq(api_key=groq_key)
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",  # Or another available Groq model
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": user_query},
-            ],
-            temperature=0.7,
-            top_p=1.0,
-        )
-        answer_content = response.choices[0].message.content
-    except Exception as e:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32000, "message": f"Groq inference failed: {str(e)}"}
-        }
+# --- RPC handler (tasks/send, tasks/sendSubscribe, batches) ---
+@router.post("/rpc")
+async def rpc_handler(request: Request):
+    return await service.dispatch(await request.body())
 
-    return {
-        "jsonrpc": "2.0",
-        "id": rpc_req.id,
-        "result": {
-            "id": rpc_req.params.get("id"),
-            "sessionId": None,
-            "status": {"state": "completed"},
-            "artifacts": [
-                {
-                    "parts": [
-                        {"type": "text", "text": {"raw": answer_content}}
-                    ],
-                    "index": 0,
-                    "append": False,
-                    "lastChunk": True
-                }
-            ],
-            "metadata": {}
-        }
-    }
+# --- Standalone app (one agent per port); gateway/main.py mounts `router` instead ---
+app = FastAPI(title=title, lifespan=agent_lifespan(*resources))
+app.include_router(router)
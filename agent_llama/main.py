@@ -1,113 +1,86 @@
 import os
-import json
+import sys
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Any, Dict, Literal
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
+from fastapi import APIRouter, FastAPI, Request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from agent_common import (
+    AgentCard,
+    AgentService,
+    InferenceExecutor,
+    RateLimiter,
+    ResponseCache,
+    SharedClient,
+    agent_lifespan,
+    create_github_models_client,
+    iter_deltas,
+)
 
 # --- Load environment variables from .env ---
 load_dotenv()
 
-app = FastAPI(title="LLaMA Answer Agent")
+# --- GitHub Inference setup for LLaMA model (one pooled client per process) ---
+model = "meta/Llama-4-Scout-17B-16E-Instruct"
+sampling = dict(temperature=0.8, top_p=0.1, max_tokens=2048)
+token = os.getenv("GITHUB_TOKEN", "")
+upstream = SharedClient.shared(create_github_models_client, token)
+executor = InferenceExecutor(name="llama")
+limiter = RateLimiter.from_env("LLAMA", requests_per_minute=15)
+cache = ResponseCache.shared()
+card = AgentCard(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../agent_openAI/agent_cards/llama_card.json"))
 
-# --- Serve the Agent Card ---
-@app.get("/.well-known/agent.json")
-async def agent_card():
-    try:
-        with open("../agent_openAI/agent_cards/llama_card.json", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        return {"error": f"Failed to load agent card: {str(e)}"}
+title = "LLaMA Answer Agent"
+resources = (card, upstream, executor, cache)
+router = APIRouter()
 
-# --- JSON-RPC 2.0 request model ---
-class JsonRpcRequest(BaseModel):
-    jsonrpc: Literal["2.0"]
-    id: str
-    method: str
-    params: Dict[str, Any]
+# --- Serve the Agent Card (loaded once at startup, ETag-validated) ---
+@router.get("/.well-known/agent.json")
+async def agent_card(request: Request):
+    return card.response(request)
 
-# --- RPC endpoint for handling user queries ---
-@app.post("/rpc")
-async def rpc_handler(rpc_req: JsonRpcRequest):
-    if rpc_req.method != "tasks/send":
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32601, "message": "Method not found"}
-        }
+# --- LLaMA request, shared by the blocking and streaming calls ---
+def completion_kwargs(user_query: str, history=()) -> dict:
+    from azure.ai.inference.models import AssistantMessage, SystemMessage, UserMessage  # deferred: keeps the SDK out of import time
 
-    # Extract user query from the request
-    message = rpc_req.params.get("message", {})
-    user_query = next(
-        (part.get("text", "") for part in message.get("parts", []) if part.get("type") == "text"),
-        ""
+    messages = [SystemMessage("You are a helpful, honest assistant.")]
+    for question, answer in history:  # earlier turns of the session, oldest first
+        messages += [UserMessage(question), AssistantMessage(answer)]
+    messages.append(UserMessage(user_query))
+    return dict(
+        messages=messages,
+        model=model,
+        **sampling
     )
 
-    if not user_query:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32602, "message": "No valid text part found in message"}
-        }
+# --- Blocking LLaMA calls, run on the bounded executor ---
+def sync_infer(user_query: str, history=()):
+    return upstream.get().complete(**completion_kwargs(user_query, history))
+
+def sync_stream(user_query: str, history=()):
+    yield from iter_deltas(upstream.get().complete(stream=True, **completion_kwargs(user_query, history)))
+
+service = AgentService(
+    upstream, executor, sync_infer, sync_stream, "LLM call failed",
+    missing_credential="Missing GitHub token in environment",
+    model=model, sampling=sampling, cache=cache,
+    limiter=limiter,
+)
 
-    # GitHub Inference Setup for LLaMA model
-    endpoint = "https://models.github.ai/inference"
-    model = "meta/Llama-4-Scout-17B-16E-Instruct"
-    token = ""
+# --- Prometheus metrics ---
+@router.get("/metrics")
+async def metrics():
+    return service.metrics.response()
 
-    if not token:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32001, "message": "Missing GitHub token in environment"}
-        }
+# --- Readiness: 200 once the upstream client is built (and warmed up with AGENT_WARMUP) ---
+@router.get("/ready")
+async def ready():
+    return service.ready_response()
 
-    # Call the LLaMA model using GitHub inference API
-    try:
-        client = ChatCompletionsClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(token),
-        )
-        response = client.complete(
-            messages=[
-                SystemMessage("You are a helpful, honest assistant."),
-                UserMessage(user_query),
-            ],
-            temperature=0.8,
-            top_p=0.1,
-            max_tokens=2048,
-            model=model
-        )
-        print("hello",response)
-        answer_content = response.choices[0].message.content
-    except Exception as e:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32000, "message": f"LLM call failed: {str(e)}"}
-        }
+# --- RPC endpoint for handling user queries (tasks/send, tasks/sendSubscribe, batches) ---
+@router.post("/rpc")
+async def rpc_handler(request: Request):
+    return await service.dispatch(await request.body())
 
-    # Format and return the response
-    return {
-        "jsonrpc": "2.0",
-        "id": rpc_req.id,
-        "result": {
-            "id": rpc_req.params.get("id"),
-            "sessionId": None,
-            "status": {"state": "completed"},
-            "artifacts": [
-                {
-                    "parts": [
-                        {"type": "text", "text": {"raw": answer_content}}
-                    ],
-                    "index": 0,
-                    "append": False,
-                    "lastChunk": True
-                }
-            ],
-            "metadata": {}
-        }
-    }
+# --- Standalone app (one agent per port); gateway/main.py mounts `router` instead ---
+app = FastAPI(title=title, lifespan=agent_lifespan(*resources))
+app.include_router(router)
@@ -1,99 +1,82 @@
-import json
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Any, Dict, Literal
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
+import os
+import sys
+from fastapi import APIRouter, FastAPI, Request
 
-app = FastAPI(title="GitHub Models QA Agent")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from agent_common import (
+    AgentCard,
+    AgentService,
+    InferenceExecutor,
+    RateLimiter,
+    ResponseCache,
+    SharedClient,
+    agent_lifespan,
+    create_github_models_client,
+    iter_deltas,
+)
 
-# --- Serve the Agent Card ---
-@app.get("/.well-known/agent.json")
-async def agent_card():
-    try:
-        with open("agent_cards/openAI_card.json", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        return {"error": f"Failed to load agent card: {str(e)}"}
+# --- Model info and the process-wide pooled client ---
+model = "openai/gpt-4.1"
+sampling = dict(temperature=1.0, top_p=1.0)
+token = os.getenv("GITHUB_TOKEN", "")
+upstream = SharedClient.shared(create_github_models_client, token)
+executor = InferenceExecutor(name="openai")
+limiter = RateLimiter.from_env("OPENAI", requests_per_minute=10)
+cache = ResponseCache.shared()
+card = AgentCard(os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_cards/openAI_card.json"))
 
-# --- JSON-RPC 2.0 request model ---
-class JsonRpcRequest(BaseModel):
-    jsonrpc: Literal["2.0"]
-    id: str
-    method: str
-    params: Dict[str, Any]
+title = "GitHub Models QA Agent"
+resources = (card, upstream, executor, cache)
+router = APIRouter()
 
-# --- RPC handler ---
-@app.post("/rpc")
-async def rpc_handler(rpc_req: JsonRpcRequest):
-    if rpc_req.method != "tasks/send":
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32601, "message": "Method not found"}
-        }
+# --- Serve the Agent Card (loaded once at startup, ETag-validated) ---
+@router.get("/.well-known/agent.json")
+async def agent_card(request: Request):
+    return card.response(request)
 
-    # Extract user query
-    message = rpc_req.params.get("message", {})
-    user_query = ""
-    for part in message.get("parts", []):
-        if part.get("type") == "text":
-            user_query = part.get("text", "")
-            break
+# --- Upstream request, shared by the blocking and streaming calls ---
+def completion_kwargs(user_query: str, history=()) -> dict:
+    from azure.ai.inference.models import AssistantMessage, SystemMessage, UserMessage  # deferred: keeps the SDK out of import time
 
-    if not user_query:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32602, "message": "No valid text part found in message"}
-        }
+    messages = [SystemMessage("You are a helpful assistant.")]
+    for question, answer in history:  # earlier turns of the session, oldest first
+        messages += [UserMessage(question), AssistantMessage(answer)]
+    messages.append(UserMessage(user_query))
+    return dict(
+        messages=messages,
+        model=model,
+        **sampling
+    )
 
-    # --- Hardcoded token and model info ---
-    endpoint = "https://models.github.ai/inference"
-    model = "openai/gpt-4.1"
-    token = ""  # 
+# --- Blocking inference calls, run on the bounded executor ---
+def sync_infer(user_query: str, history=()):
+    return upstream.get().complete(**completion_kwargs(user_query, history))
 
-    try:
-        client = ChatCompletionsClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(token),
-        )
-        response = client.complete(
-            messages=[
-                SystemMessage("You are a helpful assistant."),
-                UserMessage(user_query),
-            ],
-            temperature=1.0,
-            top_p=1.0,
-            model=model
-        )
-        answer_content = response.choices[0].message.content
-    except Exception as e:
-        return {
-            "jsonrpc": "2.0",
-            "id": rpc_req.id,
-            "error": {"code": -32000, "message": f"Model inference failed: {str(e)}"}
-        }
+def sync_stream(user_query: str, history=()):
+    yield from iter_deltas(upstream.get().complete(stream=True, **completion_kwargs(user_query, history)))
 
-    # Return result
-    return {
-        "jsonrpc": "2.0",
-        "id": rpc_req.id,
-        "result": {
-            "id": rpc_req.params.get("id"),
-            "sessionId": None,
-            "status": {"state": "completed"},
-            "artifacts": [
-                {
-                    "parts": [
-                        {"type": "text", "text": {"raw": answer_content}}
-                    ],
-                    "index": 0,
-                    "append": False,
-                    "lastChunk": True
-                }
-            ],
-            "metadata": {}
-        }
-    }
+service = AgentService(
+    upstream, executor, sync_infer, sync_stream, "Model inference failed",
+    missing_credential="Missing GITHUB_TOKEN in environment variables",
+    model=model, sampling=sampling, cache=cache,
+    limiter=limiter,
+)
+
+# --- Prometheus metrics ---
+@router.get("/metrics")
+async def metrics():
+    return service.metrics.response()
+
+# --- Readiness: 200 once the upstream client is built (and warmed up with AGENT_WARMUP) ---
+@router.get("/ready")
+async def ready():
+    return service.ready_response()
+
+# --- RPC handler (tasks/send, tasks/sendSubscribe, batches) ---
+@router.post("/rpc")
+async def rpc_handler(request: Request):
+    return await service.dispatch(await request.body())
+
+# --- Standalone app (one agent per port); gateway/main.py mounts `router` instead ---
+app = FastAPI(title=title, lifespan=agent_lifespan(*resources))
+app.include_router(router)
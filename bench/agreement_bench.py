@@ -0,0 +1,56 @@
+"""Microbenchmark of the cross-agent agreement scoring in hosting/agreement.py.
+
+Scores `--answers` synthetic answers of `--answer-words` words each (the
+first ones paraphrase a shared base text, the last is unrelated, so one
+outlier is expected) and reports the time per scoring:
+
+    python bench/agreement_bench.py --iterations 500 --answers 4 --answer-words 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "hosting"))
+from agreement import score_answers  # noqa: E402
+
+
+def build_answers(count, words, seed):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    base = [rng.choice(vocabulary) for _ in range(words)]
+    answers = {}
+    for i in range(count - 1):
+        answers[f"agent{i}"] = " ".join(w if rng.random() > 0.2 else rng.choice(vocabulary) for w in base)
+    answers[f"agent{count - 1}"] = " ".join(rng.choice(vocabulary) for _ in range(words))
+    return answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--answers", type=int, default=4)
+    parser.add_argument("--answer-words", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    answers = build_answers(args.answers, args.answer_words, args.seed)
+    score_answers(answers)  # warm up
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        agreement = score_answers(answers)
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        "settings": vars(args),
+        "ms_per_scoring": round(elapsed / args.iterations * 1000, 3),
+        "consensus": round(agreement.consensus, 3),
+        "outliers": agreement.outliers,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Microbenchmark of the `/rpc` codec.
+
+Compares, per `tasks/send` request, the old path (json.loads, pydantic
+validation, nested response dict, json.dumps) with the current one
+(`loads`, `parse_call`, `encode_task_result`). Only the codec is timed;
+no app or upstream is involved.
+
+    python bench/codec_bench.py --iterations 50000 --answer-words 300
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Literal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from agent_common.jsonrpc import encode_task_result, loads, parse_call, task_result  # noqa: E402
+
+
+def build_request(query):
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "id": "bench-1",
+        "method": "tasks/send",
+        "params": {
+            "id": "task-1",
+            "message": {"role": "user", "parts": [{"type": "text", "text": query}]},
+            "metadata": {},
+        },
+    }).encode()
+
+
+def old_path():
+    """The codec before the fast path, or None when pydantic is not installed."""
+    try:
+        from pydantic import BaseModel
+    except ImportError:
+        return None
+
+    class JsonRpcRequest(BaseModel):
+        jsonrpc: Literal["2.0"]
+        id: str
+        method: str
+        params: Dict[str, Any]
+
+    def run(body, answer):
+        rpc_req = JsonRpcRequest.model_validate(json.loads(body))
+        message = rpc_req.params.get("message", {})
+        for part in message.get("parts", []):
+            if part.get("type") == "text":
+                break
+        return json.dumps(task_result(rpc_req.id, rpc_req.params.get("id"), answer)).encode()
+
+    return run
+
+
+def new_path(body, answer):
+    call = parse_call(loads(body))
+    return encode_task_result(call.id, call.task_id, answer)
+
+
+def timed(fn, body, answer, iterations):
+    fn(body, answer)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(body, answer)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--answer-words", type=int, default=300)
+    args = parser.parse_args()
+
+    body = build_request("What is the capital of France?")
+    answer = " ".join(["lorem"] * args.answer_words)
+    report = {"iterations": args.iterations, "answer_bytes": len(answer)}
+    report["new_us_per_request"] = round(timed(new_path, body, answer, args.iterations), 2)
+    old = old_path()
+    if old is not None:
+        report["old_us_per_request"] = round(timed(old, body, answer, args.iterations), 2)
+        report["speedup"] = round(report["old_us_per_request"] / report["new_us_per_request"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
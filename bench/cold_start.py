@@ -0,0 +1,121 @@
+"""Cold-start report: import time, time to ready and first-request latency.
+
+For each agent and AGENT_PRELOAD mode, measures how long `import main`
+takes in a fresh interpreter, then starts the agent under uvicorn against
+bench/mock_upstream.py and records when it first answers HTTP, when
+`/ready` turns 200, and the latency of the first and second `tasks/send`:
+
+    python bench/cold_start.py --preload eager background lazy --warmup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from mock_upstream import add_arguments
+from run_bench import AGENTS, ROOT, agent_env, rpc_payload, rss_bytes, start_mock, start_process
+
+AGENT_PORT = 8100
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def import_seconds(directory, env):
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=os.path.join(ROOT, directory),
+                         env=env, capture_output=True, text=True)
+    return round(float(out.stdout.strip().splitlines()[-1]), 4) if out.returncode == 0 else None
+
+
+def poll(client, url, ok, timeout=30.0):
+    """perf_counter() at which `ok(response)` first holds, polling every 10 ms; None on timeout."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if ok(client.get(url, timeout=1.0)):
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def timed_send(client, url, text):
+    started = time.perf_counter()
+    resp = client.post(url, json=rpc_payload(text, "tasks/send"))
+    return round(time.perf_counter() - started, 4), resp.status_code == 200 and "error" not in resp.json()
+
+
+def cold_start(directory, env):
+    base = f"http://127.0.0.1:{AGENT_PORT}"
+    spawned = time.perf_counter()
+    proc = start_process(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(AGENT_PORT), "--log-level", "warning"],
+        os.path.join(ROOT, directory), env,
+    )
+    try:
+        with httpx.Client() as client:
+            listening = poll(client, f"{base}/.well-known/agent.json", lambda r: r.status_code < 500)
+            ready = poll(client, f"{base}/ready", lambda r: r.status_code == 200)
+            first, first_ok = timed_send(client, f"{base}/rpc", "cold start question 1")
+            second, second_ok = timed_send(client, f"{base}/rpc", "cold start question 2")
+            status = client.get(f"{base}/ready").json()
+        return {
+            "listening_s": round(listening - spawned, 4) if listening else None,
+            "ready_s": round(ready - spawned, 4) if ready else None,
+            "first_request_s": first,
+            "second_request_s": second,
+            "errors": [not first_ok, not second_ok].count(True),
+            "client_setup_s": status.get("client_setup_seconds"),
+            "warmup_s": status.get("warmup_seconds"),
+            "rss_bytes": rss_bytes(proc.pid),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agent", choices=[directory for directory, _, _ in AGENTS.values()], action="append",
+                        help="agent directory to measure (repeatable; default all)")
+    parser.add_argument("--preload", nargs="+", choices=["eager", "background", "lazy"],
+                        default=["eager", "background", "lazy"])
+    parser.add_argument("--warmup", action="store_true", help="set AGENT_WARMUP=1")
+    parser.add_argument("--mock-port", type=int, default=9000)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    env = agent_env(mock_url)
+    mock = start_mock(args, env)
+    report = {"warmup": args.warmup, "agents": {}}
+    try:
+        with httpx.Client() as client:
+            if poll(client, f"{mock_url}/stats", lambda r: r.status_code == 200) is None:
+                raise RuntimeError("mock upstream did not start")
+        for directory in args.agent or [directory for directory, _, _ in AGENTS.values()]:
+            results = {"import_s": import_seconds(directory, env)}
+            for preload in args.preload:
+                mode_env = dict(env, AGENT_PRELOAD=preload, AGENT_WARMUP="1" if args.warmup else "0")
+                results[preload] = cold_start(directory, mode_env)
+            report["agents"][directory] = results
+    finally:
+        mock.terminate()
+        mock.wait(timeout=10)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
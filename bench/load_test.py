@@ -0,0 +1,130 @@
+"""Concurrency load test for the agent servers.
+
+Loads one agent app in-process, swaps its upstream client for a fake that
+sleeps for --delay seconds, then fires --concurrency simultaneous
+`tasks/send` requests. With inference off the event loop the whole batch
+should finish in roughly one upstream delay, not concurrency x delay, and
+`/.well-known/agent.json` should stay responsive meanwhile.
+
+    python bench/load_test.py --agent agent_groq --concurrency 8 --delay 1
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENTS = ["agent_openAI", "agent_deepseek", "agent_groq", "agent_llama", "agent_google_gemma"]
+
+
+def _fake_response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class FakeAzureClient:
+    """Stands in for ChatCompletionsClient.complete()."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def complete(self, **kwargs):
+        time.sleep(self.delay)
+        return _fake_response("fake answer")
+
+    def close(self):
+        pass
+
+
+class FakeOpenAIClient:
+    """Stands in for Groq / OpenAI chat.completions.create()."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        time.sleep(self.delay)
+        return _fake_response("fake answer")
+
+    def close(self):
+        pass
+
+
+def load_agent(name):
+    for var in ("GITHUB_TOKEN", "GROQ_API_KEY", "OPENROUTER_API_KEY"):
+        os.environ.setdefault(var, "load-test")
+    agent_dir = os.path.join(ROOT, name)
+    os.chdir(agent_dir)
+    spec = importlib.util.spec_from_file_location(f"{name}_main", os.path.join(agent_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def rpc_payload(text):
+    task_id = str(uuid.uuid4())
+    return {
+        "jsonrpc": "2.0",
+        "id": task_id,
+        "method": "tasks/send",
+        "params": {
+            "id": task_id,
+            "message": {"role": "user", "parts": [{"type": "text", "text": text}]},
+            "metadata": {},
+        },
+    }
+
+
+async def run(agent_name, concurrency, delay):
+    module = load_agent(agent_name)
+    azure_style = agent_name in ("agent_openAI", "agent_deepseek", "agent_llama")
+    module.upstream.install(FakeAzureClient(delay) if azure_style else FakeOpenAIClient(delay))
+    module.executor.max_inflight = max(module.executor.max_inflight, concurrency)
+
+    transport = httpx.ASGITransport(app=module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+        started = time.perf_counter()
+        sends = [client.post("/rpc", json=rpc_payload(f"question {i}")) for i in range(concurrency)]
+        batch = asyncio.gather(*sends)
+        await asyncio.sleep(delay / 10)
+        card_started = time.perf_counter()
+        await client.get("/.well-known/agent.json")
+        card_latency = time.perf_counter() - card_started
+        responses = await batch
+        elapsed = time.perf_counter() - started
+
+    module.executor.close()
+    failures = [r for r in responses if r.status_code != 200 or "error" in r.json()]
+    return {
+        "agent": agent_name,
+        "concurrency": concurrency,
+        "upstream_delay_s": delay,
+        "elapsed_s": round(elapsed, 3),
+        "serial_estimate_s": round(concurrency * delay, 3),
+        "agent_card_latency_s": round(card_latency, 3),
+        "failures": len(failures),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agent", choices=AGENTS, default="agent_groq")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=1.0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.agent, args.concurrency, args.delay))
+    print(report)
+    # Everything should finish in about one upstream call, with some slack.
+    if report["failures"] or report["elapsed_s"] > args.delay * 2:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
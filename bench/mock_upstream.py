@@ -0,0 +1,145 @@
+"""Mock LLM upstream for offline benchmarks.
+
+Speaks the chat-completions API as used by both the Azure AI Inference SDK
+(GitHub models, `<endpoint>/chat/completions`) and the OpenAI / Groq /
+OpenRouter SDKs (`<base_url>/chat/completions`), blocking or streamed.
+Latency, token rate, answer length and injected errors are configurable:
+
+    python bench/mock_upstream.py --port 9000 --latency-median 0.8 --latency-sigma 0.4 \\
+        --tokens-per-second 80 --error-rate 0.02 --rate-limit-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = ("the agent answers every question with a short and helpful explanation of the topic "
+         "using simple words and a few concrete examples").split()
+
+
+class MockConfig:
+    def __init__(self, latency_median=0.5, latency_sigma=0.3, tokens_per_second=100.0, answer_tokens=120,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+    def first_token_latency(self) -> float:
+        """Log-normal time to first token around `latency_median`."""
+        return self.latency_median * math.exp(self.random.gauss(0, self.latency_sigma))
+
+    def tokens(self, max_tokens=None):
+        count = min(self.answer_tokens, max_tokens or self.answer_tokens)
+        return [self.random.choice(WORDS) + " " for _ in range(count)]
+
+
+def completion(model, text, prompt_tokens, completion_tokens):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def chunk(model, completion_id, delta, finish_reason=None, usage=None):
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage is not None:
+        payload["usage"] = usage
+    return payload
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock LLM upstream")
+    app.state.requests = 0
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    @app.post("/{prefix:path}/chat/completions")
+    async def chat_completions(prefix: str, request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        model = body.get("model") or "mock-model"
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+
+        roll = config.random.random()
+        if roll < config.rate_limit_rate:
+            return JSONResponse(
+                {"error": {"code": "RateLimitReached", "message": "Mock rate limit"}},
+                status_code=429, headers={"Retry-After": f"{config.retry_after:g}"},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            return JSONResponse({"error": {"code": "InternalError", "message": "Mock failure"}}, status_code=500)
+
+        await asyncio.sleep(config.first_token_latency())
+        tokens = config.tokens(body.get("max_tokens"))
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) / config.tokens_per_second)
+            return completion(model, "".join(tokens), prompt_tokens, len(tokens))
+
+        async def events():
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            yield f"data: {json.dumps(chunk(model, completion_id, {'role': 'assistant', 'content': ''}))}\n\n"
+            for token in tokens:
+                yield f"data: {json.dumps(chunk(model, completion_id, {'content': token}))}\n\n"
+                await asyncio.sleep(1 / config.tokens_per_second)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                     "total_tokens": prompt_tokens + len(tokens)}
+            yield f"data: {json.dumps(chunk(model, completion_id, {}, 'stop', usage))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency-median", type=float, default=0.5, help="median time to first token (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="log-normal spread of that latency")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(args.latency_median, args.latency_sigma, args.tokens_per_second, args.answer_tokens,
+                      args.error_rate, args.rate_limit_rate, args.retry_after, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9000)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Offline benchmark: agents and the hosting fan-out against the mock upstream.
+
+Starts bench/mock_upstream.py and every agent server as separate uvicorn
+processes, points the agents at the mock, then drives each agent's /rpc
+and the hosting fan-out (hosting/agent_client.py) at the requested
+concurrency (with --gateway, all agents run in one gateway/main.py
+process instead). Prints one JSON report (throughput, p50/p95/p99
+latency, errors, RSS per process) so runs can be diffed between commits:
+
+    python bench/run_bench.py --requests 200 --concurrency 16 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+from mock_upstream import add_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "hosting"))
+from agent_client import AgentClient, Deadline  # noqa: E402
+
+# name -> (directory, port, gateway prefix)
+AGENTS = {
+    "ChatGPT": ("agent_openAI", 8100, "openai"),
+    "DeepSeek": ("agent_deepseek", 8101, "deepseek"),
+    "Groq (LLaMA3)": ("agent_groq", 8102, "groq"),
+    "LLaMA": ("agent_llama", 8103, "llama"),
+    "Gemma": ("agent_google_gemma", 8104, "gemma"),
+}
+GATEWAY_PORT = 8100
+
+
+def agent_urls(gateway):
+    """name -> base URL of each agent, standalone or behind the gateway."""
+    if gateway:
+        return {name: f"http://127.0.0.1:{GATEWAY_PORT}/{prefix}" for name, (_, _, prefix) in AGENTS.items()}
+    return {name: f"http://127.0.0.1:{port}" for name, (_, port, _) in AGENTS.items()}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_s": percentile(ordered, 0.50),
+        "p95_s": percentile(ordered, 0.95),
+        "p99_s": percentile(ordered, 0.99),
+    }
+
+
+def rss_bytes(pid):
+    """Resident set size from /proc (Linux); None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def agent_env(mock_url):
+    """Environment that points every agent at the mock upstream with limits off."""
+    return dict(
+        os.environ,
+        GITHUB_TOKEN="bench", GROQ_API_KEY="bench", OPENROUTER_API_KEY="bench",
+        GITHUB_MODELS_ENDPOINT=f"{mock_url}/inference",
+        GROQ_BASE_URL=mock_url,
+        OPENROUTER_BASE_URL=f"{mock_url}/api/v1",
+        AGENT_CACHE_PATH="",
+        OPENAI_REQUESTS_PER_MINUTE="0", DEEPSEEK_REQUESTS_PER_MINUTE="0", LLAMA_REQUESTS_PER_MINUTE="0",
+        GROQ_REQUESTS_PER_MINUTE="0", GROQ_TOKENS_PER_MINUTE="0", OPENROUTER_REQUESTS_PER_MINUTE="0",
+    )
+
+
+def start_mock(args, env):
+    """bench/mock_upstream.py on --mock-port with the latency/error settings from add_arguments()."""
+    mock_args = [
+        "--port", str(args.mock_port),
+        "--latency-median", str(args.latency_median), "--latency-sigma", str(args.latency_sigma),
+        "--tokens-per-second", str(args.tokens_per_second), "--answer-tokens", str(args.answer_tokens),
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+        "--retry-after", str(args.retry_after),
+    ] + (["--seed", str(args.seed)] if args.seed is not None else [])
+    return start_process([sys.executable, os.path.join(ROOT, "bench", "mock_upstream.py")] + mock_args, ROOT, env)
+
+
+def start_process(args, cwd, env):
+    return subprocess.Popen(args, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url, timeout=1.0)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready")
+
+
+def rpc_payload(text, method):
+    task_id = str(uuid.uuid4())
+    return {
+        "jsonrpc": "2.0", "id": task_id, "method": method,
+        "params": {"id": task_id, "message": {"role": "user", "parts": [{"type": "text", "text": text}]},
+                   "metadata": {"noCache": True}},
+    }
+
+
+async def drive_agent(base_url, requests, concurrency, method, distinct):
+    """Send `requests` questions to one agent, `concurrency` at a time."""
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def one(i):
+            nonlocal errors
+            text = f"benchmark question {i if distinct else 0}"
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    if method == "tasks/sendSubscribe":
+                        async with client.stream("POST", "rpc", json=rpc_payload(text, method)) as resp:
+                            failed = resp.status_code != 200
+                            async for line in resp.aiter_lines():
+                                failed = failed or '"error"' in line
+                    else:
+                        resp = await client.post("rpc", json=rpc_payload(text, method))
+                        failed = resp.status_code != 200 or "error" in resp.json()
+                except httpx.HTTPError:
+                    failed = True
+                if failed:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def drive_fanout(urls, questions, concurrency):
+    """Fan each question out to every agent the way hosting/app.py does."""
+    client = AgentClient(pool_size=concurrency * len(AGENTS))
+    deadline = Deadline(connect=3.0, read=60.0, total=120.0)
+    agents = [(name, f"{url}/rpc") for name, url in urls.items()]
+
+    async def run():
+        latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def question(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                replies = await asyncio.gather(*(
+                    client.ask(name, url, f"fan-out question {i}", deadline, metadata={"noCache": True})
+                    for name, url in agents
+                ))
+                if any(reply.error for reply in replies):
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(question(i) for i in range(questions)))
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+    try:
+        return client.submit(run()).result()
+    finally:
+        client.close()
+
+
+async def bench_agents(args, urls, procs):
+    results = {}
+    for name, url in urls.items():
+        results[name] = await drive_agent(url + "/", args.requests, args.concurrency, args.method, not args.repeat)
+        results[name]["rss_bytes"] = rss_bytes(procs.get(name, procs.get("gateway")).pid)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="requests per agent")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--method", choices=["tasks/send", "tasks/sendSubscribe"], default="tasks/send")
+    parser.add_argument("--repeat", action="store_true", help="send the same question every time (exercises single-flight)")
+    parser.add_argument("--fanout-questions", type=int, default=20)
+    parser.add_argument("--gateway", action="store_true", help="run all agents in one gateway process")
+    parser.add_argument("--mock-port", type=int, default=9000)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    env = agent_env(mock_url)
+    procs = {"mock": start_mock(args, env)}
+    if args.gateway:
+        procs["gateway"] = start_process(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(GATEWAY_PORT), "--log-level", "warning"],
+            os.path.join(ROOT, "gateway"), dict(env, AGENT_GATEWAY_URL=f"http://127.0.0.1:{GATEWAY_PORT}"),
+        )
+    else:
+        for name, (directory, port, _) in AGENTS.items():
+            procs[name] = start_process(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                os.path.join(ROOT, directory), env,
+            )
+    urls = agent_urls(args.gateway)
+
+    try:
+        async def ready():
+            await wait_ready(f"{mock_url}/stats")
+            await asyncio.gather(*(wait_ready(f"{url}/.well-known/agent.json") for url in urls.values()))
+        asyncio.run(ready())
+        report = {
+            "commit": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                     capture_output=True, text=True).stdout.strip(),
+            "python": platform.python_version(),
+            "settings": vars(args),
+            "agents": asyncio.run(bench_agents(args, urls, procs)),
+            "fanout": drive_fanout(urls, args.fanout_questions, args.concurrency),
+            "rss_bytes": {name: rss_bytes(proc.pid) for name, proc in procs.items()},
+        }
+        report["upstream_requests"] = httpx.get(f"{mock_url}/stats").json()["requests"]
+    finally:
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            proc.wait(timeout=10)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""UI interaction latency from the hosting app's "render" events.
+
+hosting/app.py records how long every script run takes on the server:
+"app" for a full rerun (any widget outside a fragment), "question" for a
+run that fans a question out, and "card" / "vote" for one answer card or
+the vote panel. Cards and the vote panel also render inside full runs, so
+rows are split by run type: "card/fragment" is a click that reran only
+the card, "card/full" is the card's share of a full run. Before the
+cards and the vote panel were fragments, every click cost an "app/full"
+run; compare the rows:
+
+    python bench/ui_latency.py --events hosting/events.db --since-hours 24
+"""
+import argparse
+import json
+import sqlite3
+import time
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", default="hosting/events.db", help="the app's EVENT_STORE_PATH")
+    parser.add_argument("--since-hours", type=float, default=None, help="only runs this recent")
+    args = parser.parse_args()
+
+    sql = ("SELECT json_extract(data, '$.scope'), json_extract(data, '$.run'), latency FROM events"
+           " WHERE kind = 'render'")
+    params = []
+    if args.since_hours is not None:
+        sql += " AND ts >= ?"
+        params.append(time.time() - args.since_hours * 3600)
+
+    latencies = {}
+    with sqlite3.connect(args.events) as conn:
+        for scope, run, latency in conn.execute(sql, params):
+            latencies.setdefault(f"{scope}/{run or 'untagged'}", []).append(latency)
+
+    report = {}
+    for scope, values in sorted(latencies.items()):
+        values.sort()
+        report[scope] = {
+            "runs": len(values),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Offline before/after check of the answer-card fragments in hosting/app.py.
+
+Runs the app with Streamlit's own script runner (no browser, no agents:
+four synthetic answers are put in the session) and times each click the
+way the browser sends it: as a full run, as every click was before the
+cards were fragments, and as a fragment rerun of the card. It also
+expands a card whose tasks/get takes `--slow-seconds`: it reports how
+long the click takes, the auto-rerun timers the page registers, and
+whether the poller's first tick after the answer shows it and drops its
+timer (a timer left behind reruns for as long as the card stays expanded). Pass an older app.py
+with `--app` to compare. Uses Streamlit's testing internals, so it needs
+the pinned Streamlit version:
+
+    python bench/ui_reruns.py --runs 30
+    python bench/ui_latency.py --events /tmp/ui_reruns.db
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from unittest.mock import MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOSTING = os.path.join(ROOT, "hosting")
+LABELS = "ABCD"
+WORDS = "the quick brown fox jumps over the lazy dog and keeps running through the field".split()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(HOSTING, "app.py"))
+    parser.add_argument("--runs", type=int, default=30, help="clicks timed per kind")
+    parser.add_argument("--slow-seconds", type=float, default=1.2, help="tasks/get latency of the slow card")
+    parser.add_argument("--events", default=os.path.join(tempfile.gettempdir(), "ui_reruns.db"),
+                        help="event store the app's render events go to")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["EVENT_STORE_PATH"] = args.events
+os.environ["AGENT_BASE_URLS"] = ",".join(f"{label}=http://127.0.0.1:9" for label in LABELS)  # never reached
+os.chdir(HOSTING)
+sys.path.insert(0, HOSTING)
+
+import streamlit.logger  # noqa: E402
+from streamlit.proto.WidgetStates_pb2 import WidgetStates  # noqa: E402
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager  # noqa: E402
+from streamlit.runtime.fragment import MemoryFragmentStorage  # noqa: E402
+from streamlit.runtime.media_file_manager import MediaFileManager  # noqa: E402
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage  # noqa: E402
+from streamlit.runtime.pages_manager import PagesManager  # noqa: E402
+from streamlit.runtime.scriptrunner import RerunData  # noqa: E402
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache  # noqa: E402
+from streamlit.runtime.state.safe_session_state import SafeSessionState  # noqa: E402
+from streamlit.runtime.state.session_state import SessionState  # noqa: E402
+from streamlit.testing.v1.element_tree import parse_tree_from_messages  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas  # noqa: E402
+from streamlit.testing.v1.util import patch_config_options  # noqa: E402
+
+from agreement import score_answers  # noqa: E402
+
+streamlit.logger.set_log_level("error")
+
+
+class Browser:
+    """One session: its state and registered fragments survive across runs, as in a real server."""
+
+    def __init__(self, app, answers):
+        self.app = app
+        self.fragments = MemoryFragmentStorage()
+        state = SessionState()
+        state["$$STREAMLIT_INTERNAL_KEY_TESTING"] = {}
+        self.session = SafeSessionState(state, lambda: None)
+        self.session["summaries"] = {label: " ".join(text.split()[:25]) + "..." for label, text in answers.items()}
+        self.session["agent_errors"] = {label: None for label in answers}
+        self.session["answered_by"] = {}
+        self.session["task_refs"] = {label: ("http://127.0.0.1:9/rpc", f"task-{label}", "question") for label in answers}
+        self.session["query_id"] = "ui-reruns"
+        self.session["agreement"] = score_answers(answers)
+        self.session["expanded_answers"] = {}
+        self.widgets = None  # widget values as of the last full run, sent with every click
+        self.messages = []
+        self.page = []  # messages of the last full run, which has every card's widgets
+
+    def run(self, widget_states=None, fragment_id=None):
+        """One script run (a fragment rerun with `fragment_id`); returns its wall time."""
+        runtime = MagicMock(spec=Runtime)
+        runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+        runtime.cache_storage_manager = MemoryCacheStorageManager()
+        Runtime._instance = runtime
+        runner = LocalScriptRunner(self.app, self.session, PagesManager(self.app, ScriptCache(), setup_watcher=False))
+        runner._fragment_storage = self.fragments
+        started = time.perf_counter()
+        with patch_config_options({"global.appTest": True, "logger.level": "error"}):
+            runner.request_rerun(RerunData(widget_states=widget_states,
+                                           fragment_id_queue=[fragment_id] if fragment_id else [],
+                                           is_fragment_scoped_rerun=fragment_id is not None))
+            runner.start()
+            require_widgets_deltas(runner, 60)
+        elapsed = time.perf_counter() - started
+        self.messages = runner.forward_msgs()
+        if fragment_id is None:
+            self.page = self.messages
+            tree = parse_tree_from_messages(self.messages)
+            tree._runner = types.SimpleNamespace(session_state=self.session)
+            self.widgets = tree.get_widget_states()
+        return elapsed
+
+    def find(self, key):
+        """(widget id, fragment id) of the widget whose key is `key`, in the last run's output."""
+        for msg in self.messages + self.page:
+            if msg.WhichOneof("type") == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                widget = getattr(element, element.WhichOneof("type"))
+                if getattr(widget, "id", "").endswith(f"-{key}"):
+                    return widget.id, msg.delta.fragment_id
+        raise KeyError(key)
+
+    def click(self, key, as_fragment):
+        widget_id, fragment_id = self.find(key)
+        states = WidgetStates()
+        states.widgets.extend(w for w in self.widgets.widgets if w.id != widget_id)
+        trigger = states.widgets.add()
+        trigger.id, trigger.trigger_value = widget_id, True
+        return self.run(states, fragment_id if as_fragment else None)
+
+    def auto_reruns(self):
+        """{fragment id: interval} of the auto-rerun timers the last run registered."""
+        return {msg.auto_rerun.fragment_id: msg.auto_rerun.interval
+                for msg in self.messages if msg.WhichOneof("type") == "auto_rerun"}
+
+    def shows(self, element_type):
+        return any(msg.WhichOneof("type") == "delta" and msg.delta.new_element.WhichOneof("type") == element_type
+                   for msg in self.messages)
+
+
+def answered(text):
+    future = concurrent.futures.Future()
+    future.set_result(text)
+    return future
+
+
+def summary(values):
+    values = sorted(values)
+    return {"runs": len(values), "p50_ms": round(values[len(values) // 2] * 1000, 1),
+            "p95_ms": round(values[int(0.95 * (len(values) - 1))] * 1000, 1)}
+
+
+def main():
+    answers = {label: " ".join(WORDS[(i + j) % len(WORDS)] for j in range(400)) for i, label in enumerate(LABELS)}
+    browser = Browser(args.app, answers)
+    for _ in range(3):  # warm up imports and cached resources
+        browser.run(browser.widgets)
+
+    timings = {"full run, no click": []}
+    for _ in range(args.runs):
+        timings["full run, no click"].append(browser.run(browser.widgets))
+    for as_fragment in (False, True):
+        kind = "fragment rerun" if as_fragment else "full run"
+        for _ in range(args.runs):
+            browser.session["expanded_answers"] = {"A": answered(answers["A"])}  # tasks/get already done
+            timings.setdefault(f"Read Full Answer as {kind}", []).append(browser.click("A_more", as_fragment))
+            timings.setdefault(f"Show Less as {kind}", []).append(browser.click("A_less", as_fragment))
+
+    slow = concurrent.futures.ThreadPoolExecutor(1).submit(lambda: (time.sleep(args.slow_seconds), answers["B"])[1])
+    browser.session["expanded_answers"] = {"B": slow}
+    elapsed = browser.click("B_more", True)
+    timers = browser.auto_reruns()
+    expand = {"click_to_return_s": round(elapsed, 3), "answer_shown": browser.shows("text_area"),
+              "auto_rerun_intervals_s": list(timers.values())}
+    slow.result()
+    if timers:  # the browser's next timer tick, once tasks/get has answered
+        fragment_id, interval = next(iter(timers.items()))
+        time.sleep(interval)
+        expand["tick_after_answer_s"] = round(browser.run(browser.widgets, fragment_id), 3)
+        expand["answer_shown_after_tick"] = browser.shows("text_area")
+        expand["auto_rerun_intervals_after_tick_s"] = list(browser.auto_reruns().values())
+    browser.run(browser.widgets)
+    expand["auto_rerun_intervals_after_full_run_s"] = list(browser.auto_reruns().values())
+
+    print(json.dumps({
+        "app": os.path.relpath(args.app, ROOT),
+        "clicks": {name: summary(values) for name, values in timings.items()},
+        "slow_full_answer": expand,
+    }, indent=2))
+    time.sleep(1.0)  # let the event store's writer thread flush the render events
+    os._exit(0)  # the app's background threads (registry, exporter, leaderboard) are daemons
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""All agents in one ASGI process.
+
+    cd gateway
+    uvicorn main:app --port 8080
+
+Each agent is served under its own prefix (/openai, /deepseek, /groq,
+/llama, /gemma) with the same /rpc contract as its standalone port.
+Keep one worker per process: tasks, sessions and coalesced calls are
+in-memory, so scale with sticky single-worker replicas instead.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from agent_common.gateway import create_gateway
+
+app = create_gateway()
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import httpx
+
+TASK_NOT_FOUND = -32003  # tasks/get: the agent no longer has the task (TTL, eviction or restart)
+
+
+@dataclass
+class Deadline:
+    """Per-agent timeouts in seconds: connect, between streamed chunks, and overall."""
+    connect: float = 3.0
+    read: float = 20.0
+    total: float = 30.0
+
+
+@dataclass
+class AgentReply:
+    agent_name: str
+    answer: str = None
+    error: str = None
+    error_code: int = None
+    latency: float = None
+    answered_by: str = None
+    raw: list = field(default_factory=list)
+    task_id: str = None   # with rpc_url, where tasks/get finds the full answer later
+    rpc_url: str = None
+    attempts: list = field(default_factory=list)  # every backend asked by ask_hedged, winner included
+    cancelled: bool = False  # stopped by ask_hedged because the other backend answered first
+
+    def __post_init__(self):
+        self.answered_by = self.answered_by or self.agent_name
+
+
+def build_payload(user_query, method="tasks/send", metadata=None, task_id=None, session_id=None):
+    task_id = task_id or str(uuid.uuid4())
+    payload = {
+        "jsonrpc": "2.0",
+        "id": task_id,
+        "method": method,
+        "params": {
+            "id": task_id,
+            "message": {
+                "role": "user",
+                "parts": [{"type": "text", "text": user_query}]
+            },
+            "metadata": metadata or {}
+        }
+    }
+    if session_id:
+        payload["params"]["sessionId"] = session_id
+    return payload
+
+
+def artifact_text(artifact):
+    texts = []
+    for part in artifact.get("parts", []):
+        text_data = part.get("text", "")
+        texts.append(text_data.get("raw", "") if isinstance(text_data, dict) else text_data)
+    return "".join(texts)
+
+
+class AgentClient:
+    """Pooled async HTTP client for the agents, running on its own event loop thread.
+
+    Create it once per Streamlit server (st.cache_resource) so keep-alive
+    connections survive reruns. `submit()` schedules a coroutine on the
+    loop and returns a concurrent.futures.Future the script thread can wait on.
+    """
+
+    def __init__(self, pool_size: int = 32):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="agent-client", daemon=True)
+        self._thread.start()
+        self._http = self.submit(self._open(pool_size)).result()
+
+    async def _open(self, pool_size):
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def ask(self, agent_name, rpc_url, user_query, deadline=Deadline(), on_chunk=None, metadata=None,
+                  task_id=None, session_id=None):
+        """Ask one agent, streaming via tasks/sendSubscribe when `on_chunk` is given.
+
+        With `session_id`, the agent answers with the earlier turns of that conversation as context.
+        """
+        method = "tasks/sendSubscribe" if on_chunk else "tasks/send"
+        payload = build_payload(user_query, method, metadata, task_id, session_id)
+        timeout = httpx.Timeout(deadline.read, connect=deadline.connect)
+        reply = AgentReply(agent_name, task_id=payload["params"]["id"], rpc_url=rpc_url)
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(deadline.total):
+                async with self._http.stream("POST", rpc_url, json=payload, timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    if resp.headers.get("content-type", "").startswith("text/event-stream"):
+                        await self._read_stream(reply, resp, on_chunk)
+                    else:
+                        await resp.aread()
+                        self._read_result(reply, resp.json())
+        except TimeoutError:
+            reply.error = f"{agent_name} error: no answer within {deadline.total:g}s"
+        except httpx.TimeoutException as e:
+            reply.error = f"{agent_name} timeout: {type(e).__name__}"
+        except httpx.HTTPError as e:
+            reply.error = f"{agent_name} connection error: {str(e)}"
+        except Exception as e:
+            reply.error = f"{agent_name} error: {str(e)}"
+        reply.latency = time.perf_counter() - started
+        return reply
+
+    async def ask_hedged(self, primary, fallback, user_query, hedge_after, deadline=Deadline(), on_chunk=None,
+                         task_id=None, session_id=None):
+        """Ask `primary` (name, url); if it has not answered within `hedge_after` seconds, or fails,
+        also ask `fallback`. The first successful answer wins and the other request is cancelled.
+
+        The reply keeps the primary's agent_name; `answered_by` names the backend that answered.
+        `attempts` has one reply per backend asked (`answered_by` is its name); one that was
+        cancelled is marked `cancelled` and carries the seconds it had run.
+        """
+        primary_task = asyncio.ensure_future(self.ask(*primary, user_query, deadline, on_chunk, task_id=task_id,
+                                                     session_id=session_id))
+        started = {primary_task: (primary[0], time.perf_counter())}
+        running = {primary_task}
+        reply = None
+        try:
+            done, running = await asyncio.wait(running, timeout=hedge_after)
+            if done:
+                reply = primary_task.result()
+                if reply.error is None:
+                    return reply
+
+            fallback_task = asyncio.ensure_future(self.ask(*fallback, user_query, deadline, session_id=session_id))
+            started[fallback_task] = (fallback[0], time.perf_counter())
+            running.add(fallback_task)
+            while running:
+                finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    result = task.result()
+                    if result.error is None:
+                        reply = result
+                        return reply
+                    reply = reply or result
+            return reply
+        finally:
+            for task in running:
+                task.cancel()
+            if reply is not None:
+                reply.attempts = [self._attempt(task, name, since, reply.agent_name)
+                                  for task, (name, since) in started.items()]
+                reply.answered_by, reply.agent_name = reply.agent_name, primary[0]
+
+    @staticmethod
+    def _attempt(task, name, since, winner):
+        if task.done() and not task.cancelled():
+            return task.result()
+        elapsed = time.perf_counter() - since
+        return AgentReply(name, error=f"{name} error: cancelled after {elapsed:.1f}s, {winner} answered first",
+                          latency=elapsed, cancelled=True)
+
+    def _read_result(self, reply, data):
+        reply.raw.append(data)
+        name = reply.agent_name
+        if "error" in data:
+            reply.error = f"{name} error: {data['error'].get('message', 'Unknown error')}"
+            reply.error_code = data["error"].get("code")
+            return
+
+        artifacts = data.get("result", {}).get("artifacts", [])
+        if not artifacts:
+            reply.error = f"{name} error: No artifacts in response"
+            return
+        if not artifacts[0].get("parts"):
+            reply.error = f"{name} error: No parts in artifacts"
+            return
+        reply.answer = artifact_text(artifacts[0]) or "No raw text found"
+
+    async def _read_stream(self, reply, resp, on_chunk):
+        """Read a tasks/sendSubscribe SSE stream, reporting the text so far after each chunk.
+
+        Only a stream whose final status is `completed` gives an answer; any other final state is an error.
+        """
+        chunks = []
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[len("data:"):])
+            reply.raw.append(event)
+
+            if "error" in event:
+                reply.error = f"{reply.agent_name} error: {event['error'].get('message', 'Unknown error')}"
+                reply.error_code = event["error"].get("code")
+                return
+
+            result = event.get("result", {})
+            artifact = result.get("artifact")
+            if artifact:
+                if not artifact.get("append"):
+                    chunks.clear()
+                chunks.append(artifact_text(artifact))
+                if on_chunk:
+                    on_chunk(reply.agent_name, "".join(chunks))
+            if result.get("final"):
+                state = result.get("status", {}).get("state")
+                if state != "completed":  # e.g. canceled by tasks/cancel from another tab: the text is truncated
+                    reply.error = f"{reply.agent_name} error: stream ended {state or 'without a state'}"
+                    return
+                break
+
+        if chunks:
+            reply.answer = "".join(chunks)
+        else:
+            reply.error = f"{reply.agent_name} error: No artifacts in stream"
+
+    async def get_task(self, agent_name, rpc_url, task_id, timeout=10.0):
+        """Full answer of a finished task via tasks/get, or None if the agent no longer has it.
+
+        Raises RuntimeError on any other error.
+        """
+        payload = {"jsonrpc": "2.0", "id": str(uuid.uuid4()), "method": "tasks/get", "params": {"id": task_id}}
+        resp = await self._http.post(rpc_url, json=payload, timeout=timeout)
+        resp.raise_for_status()
+        reply = AgentReply(agent_name)
+        self._read_result(reply, resp.json())
+        if reply.error_code == TASK_NOT_FOUND:
+            return None
+        if reply.error:
+            raise RuntimeError(reply.error)
+        return reply.answer
+
+    async def full_answer(self, agent_name, rpc_url, task_id, user_query, deadline=Deadline()):
+        """Full answer of an earlier `ask`: tasks/get, or `user_query` asked again once the agent has
+        dropped the task (after its TTL, eviction or a restart). Raises RuntimeError if both fail.
+
+        The question is asked again without its session, so it adds no turn to the conversation; for a
+        first question the agent's response cache usually has the same answer.
+        """
+        answer = await self.get_task(agent_name, rpc_url, task_id)
+        if answer is not None:
+            return answer
+        reply = await self.ask(agent_name, rpc_url, user_query, deadline)
+        if reply.error:
+            raise RuntimeError(reply.error)
+        return reply.answer
+
+    async def cancel_task(self, agent_name, rpc_url, task_id, timeout=3.0):
+        """Ask an agent to stop a running task (tasks/cancel). Best effort: returns False on any failure."""
+        payload = {"jsonrpc": "2.0", "id": str(uuid.uuid4()), "method": "tasks/cancel", "params": {"id": task_id}}
+        try:
+            resp = await self._http.post(rpc_url, json=payload, timeout=timeout)
+            return resp.status_code == 200 and "error" not in resp.json()
+        except (httpx.HTTPError, ValueError):
+            return False
+
+    async def get(self, url, headers=None, timeout=5.0):
+        return await self._http.get(url, headers=headers, timeout=timeout)
+
+    def close(self):
+        self.submit(self._http.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
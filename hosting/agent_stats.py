@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import Counter, deque
+
+STATS_WINDOW = int(os.getenv("AGENT_STATS_WINDOW", "100"))          # calls kept per agent
+BREAKER_FAILURES = int(os.getenv("AGENT_BREAKER_FAILURES", "3"))    # consecutive failures that open a breaker
+BREAKER_COOLDOWN = float(os.getenv("AGENT_BREAKER_COOLDOWN", "30"))  # seconds before a half-open probe
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+class AgentStats:
+    """Rolling latency/error window for one agent."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._calls = deque(maxlen=window)  # (latency, ok)
+        self.error_codes = Counter()
+        self.cancelled = 0  # hedged calls stopped because the other backend won; neither ok nor failed
+
+    def record(self, latency, ok, error_code=None):
+        self._calls.append((latency, ok))
+        if error_code is not None:
+            self.error_codes[error_code] += 1
+
+    def latency(self, q, min_samples=1):
+        """q-quantile latency of successful calls in the window, or None with fewer than `min_samples`."""
+        latencies = sorted(lat for lat, ok in self._calls if ok and lat is not None)
+        if len(latencies) < max(min_samples, 1):
+            return None
+        return percentile(latencies, q)
+
+    @property
+    def error_rate(self):
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, ok in self._calls if not ok) / len(self._calls)
+
+    @property
+    def calls(self):
+        return len(self._calls)
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive failures; after `cooldown` lets one probe through (half-open).
+
+    A successful probe closes the breaker, a failed one re-opens it. A probe
+    that never reports back (the session went away) is given up after
+    another `cooldown`, and the next caller probes again.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if (self.state == OPEN and now - self.opened_at >= self.cooldown
+                or self.state == HALF_OPEN and now - self.probe_at >= self.cooldown):
+            self.state = HALF_OPEN
+            self.probe_at = now
+            return True
+        return False  # open, or half-open with its probe still in flight
+
+    def record(self, ok):
+        if ok:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class AgentTracker:
+    """Per-agent rolling stats and circuit breakers, shared by every Streamlit session."""
+
+    def __init__(self, window=STATS_WINDOW, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self._window = window
+        self._failures = failures
+        self._cooldown = cooldown
+        self._stats = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _get(self, label):
+        if label not in self._stats:
+            self._stats[label] = AgentStats(self._window)
+            self._breakers[label] = CircuitBreaker(self._failures, self._cooldown)
+        return self._stats[label], self._breakers[label]
+
+    def allow(self, label):
+        """False while the agent's breaker is open; callers should skip the call."""
+        with self._lock:
+            return self._get(label)[1].allow()
+
+    def record(self, label, latency, error=None, error_code=None):
+        ok = error is None
+        with self._lock:
+            stats, breaker = self._get(label)
+            stats.record(latency, ok, error_code)
+            breaker.record(ok)
+
+    def record_cancelled(self, label):
+        """A call we cancelled ourselves (a hedge's loser): counted, but kept out of the window and the breaker."""
+        with self._lock:
+            self._get(label)[0].cancelled += 1
+
+    def latency(self, label, q, min_samples=1):
+        with self._lock:
+            return self._get(label)[0].latency(q, min_samples)
+
+    def profile(self, label, q, min_samples=1):
+        """(calls in the window, error rate, q-quantile latency or None) for one agent."""
+        with self._lock:
+            stats = self._get(label)[0]
+            return stats.calls, stats.error_rate, stats.latency(q, min_samples)
+
+    def is_open(self, label):
+        """True while the breaker rejects calls; unlike allow() this never starts a half-open probe."""
+        with self._lock:
+            breaker = self._get(label)[1]
+            return breaker.state != CLOSED
+
+    def snapshot(self):
+        """Rows for display: one dict per agent."""
+        with self._lock:
+            return [
+                {
+                    "agent": label,
+                    "state": self._breakers[label].state,
+                    "calls": stats.calls,
+                    "p50 (s)": stats.latency(0.5),
+                    "p95 (s)": stats.latency(0.95),
+                    "error rate": round(stats.error_rate, 3),
+                    "error codes": dict(stats.error_codes),
+                    "cancelled": stats.cancelled,
+                }
+                for label, stats in self._stats.items()
+            ]
@@ -0,0 +1,92 @@
+import os
+import string
+
+import numpy as np
+
+# Answers whose agreement with the others is below this fraction of the median are outliers
+OUTLIER_RATIO = float(os.getenv("AGREEMENT_OUTLIER_RATIO", "0.6"))
+MIN_FOR_OUTLIERS = 3  # with two answers neither one is "the odd one out"
+
+_SPACE_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation})
+
+
+class Agreement:
+    """Pairwise similarity of the agents' answers to one question.
+
+    `matrix[i][j]` is the TF-IDF cosine similarity of answers i and j
+    (words and two-word shingles); `scores[name]` is an answer's mean
+    similarity to the others and `consensus` the mean over all pairs.
+    `outliers` lists the answers that agree with the rest far less than
+    the typical answer does.
+    """
+
+    __slots__ = ("names", "matrix", "scores", "consensus", "outliers")
+
+    def __init__(self, names, matrix, scores, consensus, outliers):
+        self.names = names
+        self.matrix = matrix
+        self.scores = scores
+        self.consensus = consensus
+        self.outliers = outliers
+
+    def table(self):
+        """Rows for st.dataframe: one per agent, with its agreement and similarity to each other answer."""
+        rows = []
+        for i, name in enumerate(self.names):
+            row = {"agent": name, "agreement": round(self.scores[name], 3), "outlier": name in self.outliers}
+            row.update({other: round(float(self.matrix[i, j]), 3) for j, other in enumerate(self.names)})
+            rows.append(row)
+        return rows
+
+
+def _features(texts):
+    """Per-answer int64 feature ids: word ids followed by two-word shingle ids."""
+    vocab = {}
+    docs = []
+    for text in texts:
+        words = text.lower().translate(_SPACE_PUNCTUATION).split()
+        docs.append(np.array([vocab.setdefault(word, len(vocab)) for word in words], dtype=np.int64))
+    size = len(vocab)
+    # a shingle (a, b) becomes size + a * size + b, so it never collides with a word id
+    return [np.concatenate((ids, size + ids[:-1] * size + ids[1:])) for ids in docs]
+
+
+def tfidf_similarity(texts):
+    """Cosine similarity matrix of sublinear TF-IDF vectors over words and two-word shingles."""
+    n = len(texts)
+    docs = _features(texts)
+    if not any(len(ids) for ids in docs):
+        return np.zeros((n, n))
+    doc_index = np.repeat(np.arange(n), [len(ids) for ids in docs])
+    features, columns = np.unique(np.concatenate(docs), return_inverse=True)
+    counts = np.bincount(doc_index * len(features) + columns, minlength=n * len(features))
+    counts = counts.reshape(n, len(features)).astype(float)
+
+    present = counts > 0
+    idf = np.log((1.0 + n) / (1.0 + present.sum(axis=0))) + 1.0
+    weights = np.where(present, 1.0 + np.log(np.maximum(counts, 1.0)), 0.0) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    weights /= np.where(norms == 0, 1.0, norms)
+    return weights @ weights.T
+
+
+def score_answers(answers):
+    """Agreement over `answers` (agent name -> answer text); empty answers are left out.
+
+    Returns None with fewer than two answers.
+    """
+    names = [name for name, text in answers.items() if text]
+    if len(names) < 2:
+        return None
+    matrix = tfidf_similarity([answers[name] for name in names])
+    n = len(names)
+    off_diagonal = ~np.eye(n, dtype=bool)
+    means = np.where(off_diagonal, matrix, 0.0).sum(axis=1) / (n - 1)
+    consensus = float(matrix[off_diagonal].mean())
+
+    outliers = []
+    if n >= MIN_FOR_OUTLIERS:
+        median = float(np.median(means))
+        outliers = [name for name, mean in zip(names, means) if mean < OUTLIER_RATIO * median]
+    scores = {name: float(mean) for name, mean in zip(names, means)}
+    return Agreement(names, matrix, scores, consensus, outliers)
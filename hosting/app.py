@@ -1,168 +1,348 @@
 import streamlit as st
-import requests
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import time
 import uuid
+import queue
 import concurrent.futures
-from gsheet_utils import log_agent_click  # ✅ Import logging function
+from agent_client import AgentClient, Deadline
+from agreement import score_answers
+from agent_stats import AgentTracker
+from event_store import get_event_store
+from gsheet_utils import log_agent_click, start_sheet_exporter  # ✅ Import logging functions
+from leaderboard import get_leaderboard
+from registry import AgentRegistry
+from routing import route
 
-# Agent endpoints
-CHATGPT_RPC = "http://localhost:8000/rpc"
-DEEPSEEK_RPC = "http://localhost:8001/rpc"
-GROQ_RPC = "http://localhost:8002/rpc"
-LLAMA_RPC = "http://localhost:8003/rpc"
+run_started = time.perf_counter()  # this script run, for the "render" timing at the end
+
+# Per-agent deadlines and the overall budget for one question
+AGENT_DEADLINE = Deadline(connect=3.0, read=20.0, total=30.0)
+FANOUT_BUDGET = 35.0
+
+# Opt-in hedging between overlapping providers: column -> fallback agent.
+# The hedge fires once the primary exceeds its observed p90 latency.
+HEDGE_FALLBACKS = {"LLaMA": "Groq (LLaMA3)", "Groq (LLaMA3)": "LLaMA"}
+HEDGE_QUANTILE = 0.9
+HEDGE_MIN_SAMPLES = 5     # successful calls needed before trusting the p90
+HEDGE_DEFAULT_DELAY = 8.0  # seconds, until then
+
+FULL_ANSWER_POLL = 0.5  # seconds between checks while an expanded card waits for tasks/get
 
 st.set_page_config(page_title="Multi-Agent QA", layout="wide")
-st.title("🤖 Multi-Agent Q&A: ChatGPT vs DeepSeek vs Groq vs LLaMA")
+st.title("🤖 Multi-Agent Q&A: compare answers side by side")
+
+# One conversation per browser session: agents answer follow-ups with the earlier turns as context
+new_conversation = st.sidebar.button("🆕 New conversation")
+if new_conversation or "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+session_id = st.session_state.session_id
 
 query = st.text_input("🔍 Ask your question:", "")
 submit = st.button("Get Answers")
 show_debug = st.checkbox("Show raw server responses (for debugging)")
+hedge = st.checkbox("⚡ Hedge slow LLaMA answers with the other LLaMA provider")
 
-# Ask individual agent
-def ask_agent(agent_name, rpc_url, user_query):
-    task_id = str(uuid.uuid4())
-    payload = {
-        "jsonrpc": "2.0",
-        "id": task_id,
-        "method": "tasks/send",
-        "params": {
-            "id": task_id,
-            "message": {
-                "role": "user",
-                "parts": [{"type": "text", "text": user_query}]
-            },
-            "metadata": {}
-        }
-    }
+# Compare every agent, or ask only the few most likely to give a good answer within a latency budget
+compare_all = st.radio(
+    "Fan-out", ["🔀 Compare all agents", "🎯 Quick answer"], horizontal=True
+) == "🔀 Compare all agents"
+if not compare_all:
+    budget_col, fanout_col = st.columns(2)
+    latency_budget = budget_col.slider("Latency budget (s)", 1.0, FANOUT_BUDGET, 10.0, step=1.0)
+    max_fanout = fanout_col.number_input("Max agents to ask", min_value=1, max_value=5, value=2)
 
-    try:
-        resp = requests.post(rpc_url, json=payload, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
+# One pooled async client per Streamlit server, shared across reruns and sessions
+@st.cache_resource
+def get_agent_client():
+    return AgentClient()
 
-        if show_debug:
-            st.markdown(f"### 🔍 Debug: {agent_name} raw response")
-            st.json(data)
+# Agents discovered from their cards (AGENT_BASE_URLS) and health-probed in the background
+@st.cache_resource
+def get_registry():
+    registry = AgentRegistry(get_agent_client())
+    registry.start()
+    return registry
 
-        if "error" in data:
-            return None, f"{agent_name} error: {data['error'].get('message', 'Unknown error')}"
+# Rolling latency/error stats and circuit breakers per agent
+@st.cache_resource
+def get_tracker():
+    return AgentTracker()
 
-        artifacts = data.get("result", {}).get("artifacts", [])
-        if not artifacts:
-            return None, f"{agent_name} error: No artifacts in response"
+events = get_event_store()
+tracker = get_tracker()
+start_sheet_exporter()
 
-        parts = artifacts[0].get("parts", [])
-        if not parts:
-            return None, f"{agent_name} error: No parts in artifacts"
-
-        text_data = parts[0].get("text", "")
-        return (text_data.get("raw", "No raw text found") if isinstance(text_data, dict) else text_data), None
-
-    except requests.exceptions.RequestException as e:
-        return None, f"{agent_name} connection error: {str(e)}"
-    except Exception as e:
-        return None, f"{agent_name} error: {str(e)}"
-
-# Summarize text (first 25 words)
+# Summarize text (first 25 words), once per answer when it arrives
 def summarize(text):
     if not text:
         return ""
     words = text.split()
     return " ".join(words[:25]) + ("..." if len(words) > 25 else "")
 
-# Render answer card with logging
-def render_answer(col, summary, full_text, error_msg, agent_label):
-    with col:
-        st.markdown(f"#### 🤖 {agent_label}")
-        if error_msg:
-            st.error(error_msg)
-        else:
-            if st.session_state.get(f"{agent_label}_expanded", False):
-                st.text_area("Full Answer", full_text, height=200, key=f"{agent_label}_text")
-                if st.button(f"Show Less ({agent_label})", key=f"{agent_label}_less"):
-                    st.session_state[f"{agent_label}_expanded"] = False
-            else:
-                st.markdown(f"**Summary:** {summary}")
-                if st.button(f"Read Full Answer ({agent_label})", key=f"{agent_label}_more"):
-                    st.session_state[f"{agent_label}_expanded"] = True
-                    log_agent_click(agent_label)  # ✅ Log the click to Google Sheets
+# True while only fragments rerun (a widget inside a fragment was used), not the whole script
+def fragment_rerun():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+# Server-side time of a full run or a fragment rerun, kept as "render" events to track UI latency.
+# A card or the vote panel also renders inside every full run, so each event says which run it was.
+def record_render(scope, started):
+    events.append("render", latency=time.perf_counter() - started, scope=scope,
+                  run="fragment" if fragment_rerun() else "full")
+
+# Expand/collapse run as button callbacks, before the card's fragment reruns, so the card
+# shows its new state straight away. The full answer is fetched from the agent's task
+# store (tasks/get) in the background, or asked again if the agent no longer has it;
+# the click is only queued to the local event store.
+def expand(agent_label):
+    st.session_state[f"{agent_label}_expanded"] = True
+    expanded = st.session_state.setdefault("expanded_answers", {})
+    if agent_label not in expanded:
+        rpc_url, task_id, question = st.session_state.task_refs[agent_label]
+        client = get_agent_client()
+        expanded[agent_label] = client.submit(
+            client.full_answer(agent_label, rpc_url, task_id, question, AGENT_DEADLINE)
+        )
+    log_agent_click(agent_label, st.session_state.get("query_id"))  # ✅ Log the click locally; synced to Google Sheets in the background
+
+def collapse(agent_label):
+    st.session_state[f"{agent_label}_expanded"] = False
+    st.session_state.expanded_answers.pop(agent_label, None)
+
+# While an expanded card's full answer is loading, only this small fragment polls it.
+# Once the answer is there it reruns the page once, which renders the card without the
+# poller, so no timer is left behind.
+@st.fragment(run_every=FULL_ANSWER_POLL)
+def full_answer_poller(future):
+    if future.done():
+        st.rerun(scope="app")
+    st.caption("⏳ Loading the full answer...")
+
+# Full answer of an expanded card; never waits for its tasks/get
+def full_answer(agent_label):
+    future = st.session_state.get("expanded_answers", {}).get(agent_label)
+    if future is None:
+        return
+    if not future.done():
+        full_answer_poller(future)
+        return
+    try:
+        st.text_area("Full Answer", future.result(), height=200, key=f"{agent_label}_text")
+    except Exception as e:
+        st.warning(f"Could not load the full answer: {str(e)}")
+
+# Answer card; a fragment, so its buttons rerun only this card
+@st.fragment
+def render_answer(summary, error_msg, agent_label, answered_by=None, outlier=False):
+    started = time.perf_counter()
+    st.markdown(f"#### 🤖 {agent_label}")
+    if answered_by and answered_by != agent_label:
+        st.caption(f"⚡ Answered by {answered_by} (hedged)")
+    if outlier:
+        st.warning("🧭 Outlier: this answer disagrees with the others")
+    if error_msg:
+        st.error(error_msg)
+    elif st.session_state.get(f"{agent_label}_expanded", False):
+        full_answer(agent_label)
+        st.button(f"Show Less ({agent_label})", key=f"{agent_label}_less", on_click=collapse, args=(agent_label,))
+    else:
+        st.markdown(f"**Summary:** {summary}")
+        st.button(f"Read Full Answer ({agent_label})", key=f"{agent_label}_more", on_click=expand, args=(agent_label,))
+    record_render("card", started)
+
+# Preference vote; a fragment, so picking an agent does not rerun the page
+@st.fragment
+def vote_panel(answered, query_id):
+    started = time.perf_counter()
+    st.markdown("### 🗳️ Which answer did you prefer?")
+    preferred = st.radio(
+        "Choose your preferred agent:",
+        answered
+    )
+    if st.button("Submit Preference"):
+        events.record_vote(preferred, query_id)
+        st.success(f"✅ Thanks! You chose: {preferred}")
+    record_render("vote", started)
+
+# Stop whatever a previous question still has running: drop its streams and tell the agents
+def cancel_outstanding():
+    client = get_agent_client()
+    for future, agent_name, rpc_url, task_id in st.session_state.pop("outstanding", []):
+        if not future.done():
+            future.cancel()
+            client.submit(client.cancel_task(agent_name, rpc_url, task_id))
 
 # Main interaction
-if submit and query:
-    agents = [
-        ("ChatGPT", CHATGPT_RPC),
-        ("DeepSeek", DEEPSEEK_RPC),
-        ("Groq (LLaMA3)", GROQ_RPC),
-        ("LLaMA", LLAMA_RPC),
-    ]
+agents = [(entry.label, entry.rpc_url) for entry in get_registry().healthy()]
+if submit and query and not agents:
+    st.error("No healthy agents found. Check that the agent servers are running.")
+
+if submit and query and agents:
+    cancel_outstanding()
 
     answers = {}
+    raw_replies = {}
+    task_refs = {}
+    query_id = str(uuid.uuid4())
+
+    if not compare_all:
+        # Agents with an open breaker are left to "compare all", which still probes them
+        candidates = [(name, url) for name, url in agents if not tracker.is_open(name)] or agents
+        ratings = {row["agent"]: row["bt_rating"] for row in get_leaderboard().snapshot()["standings"]}
+        chosen, skipped = route(candidates, tracker, ratings, latency_budget, max_fanout)
+        agents = [(choice.label, choice.url) for choice in chosen]
+        st.caption("🎯 Asking " + ", ".join(name for name, _ in agents)
+                   + "".join(f" · skipped {choice.label} ({choice.reason})" for choice in skipped))
+    events.append("route", query_id=query_id, asked=len(agents), compare_all=compare_all)
+
+    # Live columns: filled in as tokens arrive, finalized as soon as each agent answers
+    updates = queue.Queue()
+    live = st.empty()
+    with live.container():
+        live_text = {}
+        for col, (name, _) in zip(st.columns(len(agents)), agents):
+            with col:
+                st.markdown(f"#### 🤖 {name}")
+                live_text[name] = st.empty()
+
+    def on_chunk(agent_name, text_so_far):
+        updates.put((agent_name, text_so_far))
+
+    def drain_updates():
+        latest = {}
+        while not updates.empty():
+            agent_name, text_so_far = updates.get_nowait()
+            latest[agent_name] = text_so_far
+        for agent_name, text_so_far in latest.items():
+            if agent_name not in answers:
+                live_text[agent_name].markdown(text_so_far)
+
+    # Agents with an open breaker are shown as unavailable right away instead of costing a timeout
+    for name, _ in agents:
+        if not tracker.allow(name):
+            answers[name] = (None, f"{name} is temporarily unavailable (circuit open)")
+            live_text[name].warning(answers[name][1])
+
+    client = get_agent_client()
+    agent_urls = dict(agents)
+    answered_by = {}
+
+    def ask(name, url, task_id):
+        fallback = HEDGE_FALLBACKS.get(name)
+        if hedge and fallback in agent_urls and not tracker.is_open(fallback):
+            hedge_after = tracker.latency(name, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES) or HEDGE_DEFAULT_DELAY
+            return client.ask_hedged(
+                (name, url), (fallback, agent_urls[fallback]), query, hedge_after, AGENT_DEADLINE, on_chunk,
+                task_id=task_id, session_id=session_id
+            )
+        return client.ask(name, url, query, AGENT_DEADLINE, on_chunk, task_id=task_id, session_id=session_id)
 
     with st.spinner("⏳ Getting answers..."):
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_agent = {
-                executor.submit(ask_agent, name, url, query): name
-                for name, url in agents
-            }
-            for future in concurrent.futures.as_completed(future_to_agent):
+        # Remembered until the fan-out ends, so a new question can cancel these if this run is interrupted
+        outstanding = []
+        for name, url in agents:
+            if name not in answers:
+                task_id = str(uuid.uuid4())
+                outstanding.append((client.submit(ask(name, url, task_id)), name, url, task_id))
+        st.session_state.outstanding = outstanding
+        future_to_agent = {future: name for future, name, _, _ in outstanding}
+        budget_ends = time.monotonic() + FANOUT_BUDGET
+        pending = set(future_to_agent)
+        while pending and time.monotonic() < budget_ends:
+            done, pending = concurrent.futures.wait(
+                pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            drain_updates()
+            for future in done:
                 agent_name = future_to_agent[future]
                 try:
-                    answer, error = future.result()
-                    answers[agent_name] = (answer, error)
+                    reply = future.result()
+                    answers[agent_name] = (reply.answer, reply.error)
+                    raw_replies[agent_name] = reply.raw
+                    answered_by[agent_name] = reply.answered_by
+                    task_refs[agent_name] = (reply.rpc_url, reply.task_id, query)
+                    # The answer counts for its column; a hedge's winning backend is kept in answered_by
+                    events.record_answer(query_id, agent_name, reply.latency, reply.error,
+                                         answered_by=reply.answered_by)
+                    for attempt in reply.attempts or [reply]:  # a hedged call also reports the backend that lost
+                        if attempt.cancelled:
+                            tracker.record_cancelled(attempt.answered_by)
+                        else:
+                            tracker.record(attempt.answered_by, attempt.latency, attempt.error, attempt.error_code)
+                        if attempt is not reply:
+                            events.record_answer(query_id, attempt.answered_by, attempt.latency, attempt.error,
+                                                 hedged_for=agent_name, cancelled=attempt.cancelled)
                 except Exception as e:
                     answers[agent_name] = (None, f"{agent_name} error: {str(e)}")
+                    tracker.record(agent_name, None, answers[agent_name][1])
+                answer, error = answers[agent_name]
+                if error:
+                    live_text[agent_name].error(error)
+                elif answered_by.get(agent_name, agent_name) != agent_name:
+                    live_text[agent_name].markdown(f"*⚡ via {answered_by[agent_name]}*\n\n{answer}")
+                else:
+                    live_text[agent_name].markdown(answer)
+        cancel_outstanding()
+        for future in pending:
+            agent_name = future_to_agent[future]
+            answers[agent_name] = (None, f"{agent_name} error: no answer within {FANOUT_BUDGET:g}s budget")
+            events.record_answer(query_id, agent_name, FANOUT_BUDGET, answers[agent_name][1])
+            tracker.record(agent_name, FANOUT_BUDGET, answers[agent_name][1])
+    live.empty()
+
+    if show_debug:
+        for agent_name, raw in raw_replies.items():
+            st.markdown(f"### 🔍 Debug: {agent_name} raw response")
+            st.json(raw)
+
+    # Keep only derived data in session_state, computed once per query id: summaries and agreement.
+    # Full answers stay on the agents until a card is expanded; reruns never re-derive anything
+    st.session_state.query_id = query_id
+    st.session_state.agreement = score_answers({name: answer for name, (answer, _) in answers.items()})
+    st.session_state.summaries = {name: summarize(answers[name][0]) for name, _ in agents}
+    st.session_state.agent_errors = {name: answers[name][1] for name, _ in agents}
+    st.session_state.answered_by = answered_by
+    st.session_state.task_refs = task_refs
+    st.session_state.expanded_answers = {}
+    for name, _ in agents:
+        st.session_state[f"{name}_expanded"] = False
+
+# Live per-agent health
+with st.sidebar.expander("📈 Agent health"):
+    st.dataframe(tracker.snapshot(), hide_index=True)
 
-    # Save answers to session_state for later access
-    st.session_state.full_answers = {
-        "ChatGPT": answers["ChatGPT"][0],
-        "DeepSeek": answers["DeepSeek"][0],
-        "Groq (LLaMA3)": answers["Groq (LLaMA3)"][0],
-        "LLaMA": answers["LLaMA"][0],
-    }
-
-    st.session_state.agent_errors = {
-        "ChatGPT": answers["ChatGPT"][1],
-        "DeepSeek": answers["DeepSeek"][1],
-        "Groq (LLaMA3)": answers["Groq (LLaMA3)"][1],
-        "LLaMA": answers["LLaMA"][1],
-    }
+# Preference leaderboard from votes and clicks, refreshed in the background
+with st.sidebar.expander("🏆 Leaderboard"):
+    board = get_leaderboard().snapshot()
+    if board["standings"]:
+        st.dataframe(board["standings"], hide_index=True)
+        st.caption(f"{board['comparisons']} pairwise preferences; ranked by Bradley-Terry rating (95% interval). "
+                   "Elo is approximate and order-dependent.")
+    else:
+        st.caption("No votes yet.")
 
 # Show responses if available
-if "full_answers" in st.session_state:
-    col1, col2, col3, col4 = st.columns(4)
-    render_answer(
-        col1,
-        summarize(st.session_state.full_answers["ChatGPT"]),
-        st.session_state.full_answers["ChatGPT"],
-        st.session_state.agent_errors["ChatGPT"],
-        "ChatGPT"
-    )
-    render_answer(
-        col2,
-        summarize(st.session_state.full_answers["DeepSeek"]),
-        st.session_state.full_answers["DeepSeek"],
-        st.session_state.agent_errors["DeepSeek"],
-        "DeepSeek"
-    )
-    render_answer(
-        col3,
-        summarize(st.session_state.full_answers["Groq (LLaMA3)"]),
-        st.session_state.full_answers["Groq (LLaMA3)"],
-        st.session_state.agent_errors["Groq (LLaMA3)"],
-        "Groq (LLaMA3)"
-    )
-    render_answer(
-        col4,
-        summarize(st.session_state.full_answers["LLaMA"]),
-        st.session_state.full_answers["LLaMA"],
-        st.session_state.agent_errors["LLaMA"],
-        "LLaMA"
-    )
+if "summaries" in st.session_state:
+    summaries = st.session_state.summaries
+    agreement = st.session_state.get("agreement")
+    for col, agent_label in zip(st.columns(len(summaries)), summaries):
+        with col:
+            render_answer(
+                summaries[agent_label],
+                st.session_state.agent_errors[agent_label],
+                agent_label,
+                st.session_state.get("answered_by", {}).get(agent_label),
+                agreement is not None and agent_label in agreement.outliers
+            )
 
-    if all(val for val in st.session_state.full_answers.values()):
-        st.markdown("### 🗳️ Which answer did you prefer?")
-        preferred = st.radio(
-            "Choose your preferred agent:",
-            ("ChatGPT", "DeepSeek", "Groq (LLaMA3)", "LLaMA")
-        )
-        if st.button("Submit Preference"):
-            st.success(f"✅ Thanks! You chose: {preferred}")
+    if agreement is not None:
+        st.markdown("### 🤝 Agreement between answers")
+        st.metric("Consensus", f"{agreement.consensus:.0%}",
+                  help="Mean TF-IDF cosine similarity over every pair of answers")
+        st.dataframe(agreement.table(), hide_index=True)
+
+    answered = [name for name, summary in summaries.items() if summary]
+    if len(answered) > 1:
+        vote_panel(answered, st.session_state.get("query_id"))
+
+record_render("question" if submit and query and agents else "app", run_started)
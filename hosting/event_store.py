@@ -0,0 +1,170 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", "events.db")
+QUEUE_SIZE = 10000   # events buffered before append() applies backpressure
+PUT_TIMEOUT = 0.5    # how long an append waits for queue space before it is dropped
+BATCH_SIZE = 500     # max events written per transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    query_id TEXT,
+    agent TEXT,
+    latency REAL,
+    error TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_agent ON events (kind, agent);
+CREATE INDEX IF NOT EXISTS events_query ON events (query_id);
+"""
+
+
+class EventStore:
+    """Append-only local event log in SQLite WAL mode.
+
+    `append()` only queues the event; one writer thread commits queued
+    events in batches, and readers use their own connections, which WAL
+    lets run concurrently with the writer. Event kinds used by the app:
+    "answer" (per-agent latency/error for a query; one successful answer
+    per answer column, whichever backend produced it), "click" and "vote".
+    """
+
+    def __init__(self, path=EVENT_STORE_PATH, queue_size=QUEUE_SIZE, put_timeout=PUT_TIMEOUT):
+        self.path = path
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._local = threading.local()
+        self.dropped = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self._thread = threading.Thread(target=self._write_loop, name="event-store", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Writing ---
+
+    def append(self, kind, query_id=None, agent=None, latency=None, error=None, **data) -> bool:
+        """Queue one event; returns False if the queue stayed full and it was dropped."""
+        row = (time.time(), kind, query_id, agent, latency, error, json.dumps(data) if data else None)
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def record_answer(self, query_id, agent, latency, error=None, **data):
+        return self.append("answer", query_id=query_id, agent=agent, latency=latency, error=error, **data)
+
+    def record_click(self, agent, query_id=None):
+        return self.append("click", query_id=query_id, agent=agent)
+
+    def record_vote(self, agent, query_id=None):
+        return self.append("vote", query_id=query_id, agent=agent)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            row = self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    row = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._queue.put(None)
+                    break
+                batch.append(row)
+            with conn:
+                conn.executemany(
+                    "INSERT INTO events (ts, kind, query_id, agent, latency, error, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+        conn.close()
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # --- Reading ---
+
+    def counts(self, kind) -> dict:
+        rows = self._reader().execute(
+            "SELECT agent, COUNT(*) FROM events WHERE kind = ? GROUP BY agent", (kind,)
+        ).fetchall()
+        return dict(rows)
+
+    def events(self, kinds=None, after_id=0, limit=None):
+        """Events with id > after_id, oldest first, as (id, ts, kind, query_id, agent, latency, error) rows."""
+        sql = "SELECT id, ts, kind, query_id, agent, latency, error FROM events WHERE id > ?"
+        args = [after_id]
+        if kinds:
+            sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+            args.extend(kinds)
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return self._reader().execute(sql, args).fetchall()
+
+    def last_id(self) -> int:
+        """Id of the newest committed event (0 when empty)."""
+        return self._reader().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def comparisons(self, after_id=0, upto_id=None):
+        """Cursor over pairwise preferences from votes and clicks with after_id < id <= upto_id, oldest first.
+
+        Each "vote"/"click" on an agent yields one (id, kind, preferred, other)
+        row per other agent that answered the same query without error.
+        """
+        # CROSS JOIN, INDEXED BY and +kind pin the plan: walk the id range once and look up
+        # each vote's answers by query id, instead of scanning every answer per vote
+        sql = """
+            SELECT p.id, p.kind, p.agent, a.agent FROM events p
+            CROSS JOIN events a INDEXED BY events_query
+                ON a.query_id = p.query_id AND a.kind = 'answer' AND a.error IS NULL AND a.agent != p.agent
+            WHERE p.id > ? AND +p.kind IN ('vote', 'click')
+        """
+        args = [after_id]
+        if upto_id is not None:
+            sql += " AND p.id <= ?"
+            args.append(upto_id)
+        return self._reader().execute(sql + " ORDER BY p.id", args)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_event_store():
+    """Process-wide EventStore, flushed on interpreter shutdown."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore()
+            atexit.register(_store.close)
+    return _store
@@ -0,0 +1,37 @@
+import re
+
+
+class FakeSheet:
+    """In-memory stand-in for a gspread Worksheet with "Agent Name | Count | Votes" rows.
+
+    Implements only what SheetExporter uses (`get`, `batch_update`,
+    `append_rows`) and records each call so offline checks can assert
+    how many API round trips an export made.
+    """
+
+    def __init__(self, rows=None, header=True):
+        self.rows = ([["Agent Name", "Count", "Votes"]] if header else []) + [list(r) for r in (rows or [])]
+        self.calls = []
+
+    def get(self, range_name):
+        self.calls.append(("get", range_name))
+        first_row = int(re.match(r"[A-Z](\d+)", range_name).group(1))
+        return [list(r) for r in self.rows[first_row - 1:]]
+
+    def batch_update(self, data):
+        self.calls.append(("batch_update", len(data)))
+        for update in data:
+            col, row = re.match(r"([A-Z])(\d+)", update["range"]).groups()
+            cells = self.rows[int(row) - 1]
+            start = ord(col) - ord("A")
+            for offset, value in enumerate(update["values"][0]):
+                while len(cells) <= start + offset:
+                    cells.append("")
+                cells[start + offset] = value
+
+    def append_rows(self, values):
+        self.calls.append(("append_rows", len(values)))
+        self.rows.extend(list(v) for v in values)
+
+    def counts(self):
+        return {row[0]: [int(v) for v in row[1:]] for row in self.rows[1:]}
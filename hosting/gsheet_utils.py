@@ -1,31 +1,134 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import atexit
+import threading
+from functools import lru_cache
+
+from event_store import get_event_store
 
 # Google Sheets setup
 SCOPE = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
 SHEET_NAME = "Agent click logs"  # Must match your Google Sheet name
+HEADER = ["Agent Name", "Count", "Votes"]
+
+EXPORT_INTERVAL = 30.0  # seconds between syncs of aggregates to the sheet
 
+@lru_cache(maxsize=1)
 def get_gsheet_client():
+    """Authorized gspread client, created once per process."""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
     creds = ServiceAccountCredentials.from_json_keyfile_name("Credentials.json", SCOPE)
     client = gspread.authorize(creds)
     return client
 
-def log_agent_click(agent_name):
-    client = get_gsheet_client()
-    sheet = client.open(SHEET_NAME).sheet1  # Using the first sheet
-
-    # Get all existing records
-    data = sheet.get_all_records()
-
-    # Check if agent already has a row
-    found = False
-    for idx, row in enumerate(data, start=2):  # row 1 = header, so data starts at 2
-        if row["Agent Name"] == agent_name:
-            count = int(row["Count"]) + 1
-            sheet.update_cell(idx, 2, count)
-            found = True
-            break
-
-    if not found:
-        # Append new row
-        sheet.append_row([agent_name, 1])
+def open_click_sheet():
+    return get_gsheet_client().open(SHEET_NAME).sheet1  # Using the first sheet
+
+def event_store_aggregates():
+    """{agent: [clicks, votes]} from the local event store."""
+    store = get_event_store()
+    clicks, votes = store.counts("click"), store.counts("vote")
+    return {agent: [clicks.get(agent, 0), votes.get(agent, 0)] for agent in sorted(set(clicks) | set(votes))}
+
+def _count(row, col):
+    try:
+        return int(row[col])
+    except (IndexError, TypeError, ValueError):
+        return 0
+
+class SheetExporter:
+    """Adds per-agent clicks and votes to the "Agent Name | Count | Votes" sheet in the background.
+
+    The local event store is the source of truth; every `interval` seconds
+    this thread recomputes the aggregates and, if they changed, reads the
+    sheet once and adds what was counted since the last export to the
+    sheet's own counts with a single `batch_update` (new agents via one
+    `append_rows`, after the header row if the sheet is empty). Counts
+    already in the sheet, e.g. from other app instances, are kept. Events
+    recorded before the exporter started are taken as exported.
+    `sheet_factory` returns the worksheet, e.g. a FakeSheet offline.
+    """
+
+    def __init__(self, aggregates_fn=event_store_aggregates, sheet_factory=open_click_sheet,
+                 interval=EXPORT_INTERVAL):
+        self._aggregates_fn = aggregates_fn
+        self._sheet_factory = sheet_factory
+        self._sheet = None
+        self.interval = interval
+        self._exported = None  # aggregates already in the sheet; read on the first export if this fails
+        self._stop = threading.Event()
+        self._export_lock = threading.Lock()
+        self.export_errors = 0
+        try:
+            self._exported = dict(aggregates_fn())
+        except Exception:
+            self.export_errors += 1
+        self._thread = threading.Thread(target=self._run, name="sheet-exporter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self):
+        """Add new clicks and votes to the sheet; failures are retried on the next run."""
+        with self._export_lock:
+            try:
+                aggregates = self._aggregates_fn()
+                if self._exported is None:
+                    self._exported = dict(aggregates)
+                if aggregates != self._exported:
+                    self._write(aggregates)
+            except Exception:
+                self.export_errors += 1
+
+    def _write(self, aggregates):
+        if self._sheet is None:
+            self._sheet = self._sheet_factory()
+        rows = self._sheet.get("A1:C")
+
+        deltas = {}
+        for name, values in aggregates.items():
+            delta = [now - before for now, before in zip(values, self._exported.get(name, [0, 0]))]
+            if any(delta):
+                deltas[name] = delta
+
+        updates, written = [], {}
+        for idx, row in enumerate(rows[1:], start=2):  # row 1 = header, so data starts at 2
+            name = row[0] if row else ""
+            if name in deltas:
+                delta = deltas.pop(name)
+                updates.append({"range": f"B{idx}:C{idx}", "values": [[_count(row, 1) + delta[0],
+                                                                      _count(row, 2) + delta[1]]]})
+                written[name] = aggregates[name]
+        # Each step marks its agents exported, so a failed append does not re-add the updated rows
+        if updates:
+            self._sheet.batch_update(updates)
+            self._exported.update(written)
+        if deltas:
+            # Append new rows for agents not in the sheet yet
+            self._sheet.append_rows(([] if rows else [HEADER]) + [[name] + delta for name, delta in deltas.items()])
+            self._exported.update((name, aggregates[name]) for name in deltas)
+
+    def close(self):
+        """Stop the background thread after one last export."""
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 1)
+        self.export()
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def start_sheet_exporter():
+    """Process-wide SheetExporter, exporting once more on interpreter shutdown."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = SheetExporter()
+            atexit.register(_exporter.close)
+    return _exporter
+
+def log_agent_click(agent_name, query_id=None):
+    """Record one "Read Full Answer" click locally; the sheet is updated in the background."""
+    start_sheet_exporter()
+    return get_event_store().record_click(agent_name, query_id)
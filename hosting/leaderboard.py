@@ -0,0 +1,232 @@
+import atexit
+import math
+import os
+import threading
+
+import numpy as np
+
+from event_store import get_event_store
+
+ELO_BASE = 1000.0
+ELO_K = float(os.getenv("LEADERBOARD_ELO_K", "4"))                 # small: Elo is noisy with many comparisons
+ELO_PERIOD = int(os.getenv("LEADERBOARD_ELO_PERIOD", "64"))        # comparisons rated against the same ratings
+CLICK_WEIGHT = float(os.getenv("LEADERBOARD_CLICK_WEIGHT", "0.25"))  # a "Read Full Answer" click vs a vote
+BT_PRIOR = float(os.getenv("LEADERBOARD_BT_PRIOR", "1.0"))         # virtual games per pair, split evenly
+REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH", "5"))    # seconds between ingests of new events
+BT_ITERATIONS = 500
+BT_TOLERANCE = 1e-9
+FETCH_ROWS = 50000  # comparison rows read from the event store at a time
+MAX_CHUNKS = 32     # stored comparison arrays before they are merged into one
+Z_95 = 1.959964
+
+ELO_SCALE = 400.0 / math.log(10.0)  # Bradley-Terry log-strength -> Elo points
+
+
+def elo_update(ratings, winners, losers, weights, k=ELO_K, period=ELO_PERIOD):
+    """Elo over comparisons in order, in rating periods of `period` comparisons.
+
+    Within a period every comparison is scored against the ratings at its
+    start (as in a tournament rating period), so each period is one
+    vectorized update. Updates `ratings` in place.
+    """
+    n = len(ratings)
+    for start in range(0, len(winners), period):
+        w, l, weight = winners[start:start + period], losers[start:start + period], weights[start:start + period]
+        expected = 1.0 / (1.0 + 10.0 ** ((ratings[l] - ratings[w]) / 400.0))
+        delta = k * weight * (1.0 - expected)
+        ratings += np.bincount(w, delta, minlength=n) - np.bincount(l, delta, minlength=n)
+    return ratings
+
+
+def bradley_terry(wins, prior=BT_PRIOR):
+    """Bradley-Terry log-strengths and their standard errors from a weighted win matrix.
+
+    `wins[i, j]` is how often i was preferred over j. Fitted with the MM
+    algorithm (Hunter, 2004) after adding `prior` virtual games to every
+    pair, which keeps agents with only wins or only losses finite. Standard
+    errors come from the Fisher information, with strengths centred on 0.
+    """
+    n = len(wins)
+    wins = wins + (prior / 2.0) * (1.0 - np.eye(n))
+    games = wins + wins.T
+    won = wins.sum(axis=1)
+    strength = np.ones(n)
+    for _ in range(BT_ITERATIONS):
+        updated = won / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        updated /= np.exp(np.log(updated).mean())
+        converged = np.abs(updated - strength).max() < BT_TOLERANCE
+        strength = updated
+        if converged:
+            break
+
+    pair = strength[:, None] * strength[None, :] / (strength[:, None] + strength[None, :]) ** 2
+    information = -games * pair
+    np.fill_diagonal(information, 0.0)
+    np.fill_diagonal(information, -information.sum(axis=1))
+    covariance = np.linalg.pinv(information)
+    return np.log(strength), np.sqrt(np.maximum(np.diag(covariance), 0.0))
+
+
+class Leaderboard:
+    """Bradley-Terry ratings of the agents from the event store's votes and clicks, with Elo alongside.
+
+    Bradley-Terry, fitted on every comparison at once, is the ranking. Elo
+    depends on the order of the comparisons and only approximates it; it is
+    kept as a secondary, recent-form view. A vote (or, at `click_weight`, a "Read Full Answer" click) for one agent
+    counts as a win over every other agent that answered the same query.
+    A background thread ingests only events newer than the last refresh,
+    every `interval` seconds: their comparisons are appended to compact
+    arrays, Elo is updated from where it stopped and Bradley-Terry is
+    refitted from the win matrix. `recompute()` rates every stored
+    comparison again (e.g. with another K or click weight) without going
+    back to the event store. Readers only take the latest snapshot.
+    """
+
+    def __init__(self, store, click_weight=CLICK_WEIGHT, k=ELO_K, period=ELO_PERIOD, prior=BT_PRIOR,
+                 interval=REFRESH_INTERVAL):
+        self.store = store
+        self.click_weight = click_weight
+        self.k = k
+        self.period = period
+        self.prior = prior
+        self.interval = interval
+        self.agents = []
+        self._index = {}
+        self._chunks = []  # (winners, losers, is_vote) arrays, oldest first
+        self.elo = np.zeros(0)
+        self.last_id = 0
+        self.refresh_errors = 0
+        self._lock = threading.Lock()
+        self._snapshot = self._build_snapshot(np.zeros((0, 0)))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="leaderboard", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                self.refresh_errors += 1
+            if self._stop.wait(self.interval):
+                return
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+
+    def refresh(self) -> int:
+        """Ingest votes and clicks newer than the last refresh; returns how many comparisons were added."""
+        with self._lock:
+            upto = self.store.last_id()
+            if upto <= self.last_id:
+                return 0
+            cursor = self.store.comparisons(self.last_id, upto)
+            added = 0
+            while True:
+                rows = cursor.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                winners, losers, is_vote = self._encode(rows)
+                self._chunks.append((winners, losers, is_vote))
+                if len(self.agents) > len(self.elo):
+                    self.elo = np.concatenate((self.elo, np.full(len(self.agents) - len(self.elo), ELO_BASE)))
+                elo_update(self.elo, winners, losers, self._weights(is_vote), self.k, self.period)
+                added += len(rows)
+            self.last_id = upto
+            if len(self._chunks) > MAX_CHUNKS:
+                self._merge_chunks()
+            if added:
+                self._publish()
+            return added
+
+    def recompute(self, click_weight=None, k=None):
+        """Rate every stored comparison from scratch, optionally with another click weight or K."""
+        with self._lock:
+            if click_weight is not None:
+                self.click_weight = click_weight
+            if k is not None:
+                self.k = k
+            self.elo = np.full(len(self.agents), ELO_BASE)
+            if self._chunks:
+                self._merge_chunks()
+                winners, losers, is_vote = self._chunks[0]
+                elo_update(self.elo, winners, losers, self._weights(is_vote), self.k, self.period)
+            self._publish()
+
+    def _merge_chunks(self):
+        self._chunks = [tuple(np.concatenate(arrays) for arrays in zip(*self._chunks))]
+
+    def _encode(self, rows):
+        index = self._index
+        for name in {row[2] for row in rows} | {row[3] for row in rows}:
+            if name not in index:
+                index[name] = len(self.agents)
+                self.agents.append(name)
+        count = len(rows)
+        winners = np.fromiter((index[row[2]] for row in rows), dtype=np.int32, count=count)
+        losers = np.fromiter((index[row[3]] for row in rows), dtype=np.int32, count=count)
+        is_vote = np.fromiter((row[1] == "vote" for row in rows), dtype=bool, count=count)
+        return winners, losers, is_vote
+
+    def _weights(self, is_vote):
+        return np.where(is_vote, 1.0, self.click_weight)
+
+    def _wins(self):
+        """Weighted win matrix over every stored comparison."""
+        n = len(self.agents)
+        wins = np.zeros(n * n)
+        for winners, losers, is_vote in self._chunks:
+            wins += np.bincount(winners * n + losers, self._weights(is_vote), minlength=n * n)
+        return wins.reshape(n, n)
+
+    def _publish(self):
+        self._snapshot = self._build_snapshot(self._wins())
+
+    def _build_snapshot(self, wins):
+        strength, stderr = bradley_terry(wins, self.prior) if len(wins) else ((), ())
+        standings = []
+        for i, name in enumerate(self.agents):
+            rating = ELO_BASE + ELO_SCALE * strength[i]
+            margin = Z_95 * ELO_SCALE * stderr[i]
+            standings.append({
+                "agent": name,
+                "bt_rating": round(float(rating), 1),
+                "ci95_low": round(float(rating - margin), 1),
+                "ci95_high": round(float(rating + margin), 1),
+                "elo": round(float(self.elo[i]), 1),
+                "wins": round(float(wins[i].sum()), 2),
+                "losses": round(float(wins[:, i].sum()), 2),
+            })
+        standings.sort(key=lambda row: row["bt_rating"], reverse=True)
+        return {
+            "standings": standings,
+            "comparisons": int(sum(len(chunk[0]) for chunk in self._chunks)),
+            "last_event_id": self.last_id,
+            "click_weight": self.click_weight,
+            "elo_k": self.k,
+        }
+
+    def snapshot(self) -> dict:
+        """Latest JSON-ready leaderboard; never waits for a refresh."""
+        return self._snapshot
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """Process-wide Leaderboard over the event store, refreshing in the background."""
+    global _leaderboard
+    with _leaderboard_lock:
+        if _leaderboard is None:
+            _leaderboard = Leaderboard(get_event_store())
+            _leaderboard.start()
+            atexit.register(_leaderboard.close)
+    return _leaderboard
@@ -0,0 +1,31 @@
+"""Preference leaderboard as JSON, next to the Streamlit app.
+
+    cd hosting
+    uvicorn leaderboard_api:app --port 8090
+
+Reads the same event store (EVENT_STORE_PATH) as app.py; WAL lets it
+read while the app writes.
+"""
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from leaderboard import get_leaderboard
+
+
+@asynccontextmanager
+async def lifespan(app):
+    board = get_leaderboard()
+    try:
+        yield
+    finally:
+        board.close()
+
+
+app = FastAPI(title="Agent preference leaderboard", lifespan=lifespan)
+
+
+@app.get("/leaderboard")
+async def leaderboard():
+    """Bradley-Terry standings with 95% intervals (and approximate Elo), as of the last background refresh."""
+    return get_leaderboard().snapshot()
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+# label=base_url pairs; the card at <base_url>/.well-known/agent.json is probed for health and skills
+DEFAULT_DIRECTORY = (
+    "ChatGPT=http://localhost:8000,"
+    "DeepSeek=http://localhost:8001,"
+    "Groq (LLaMA3)=http://localhost:8002,"
+    "LLaMA=http://localhost:8003,"
+    "Gemma=http://localhost:8004"
+)
+# With AGENT_GATEWAY_URL set, the same agents are found under the gateway's path prefixes
+GATEWAY_PREFIXES = {
+    "ChatGPT": "openai",
+    "DeepSeek": "deepseek",
+    "Groq (LLaMA3)": "groq",
+    "LLaMA": "llama",
+    "Gemma": "gemma",
+}
+GATEWAY_URL = os.getenv("AGENT_GATEWAY_URL", "").rstrip("/")
+if GATEWAY_URL:
+    DEFAULT_DIRECTORY = ",".join(f"{label}={GATEWAY_URL}/{prefix}" for label, prefix in GATEWAY_PREFIXES.items())
+AGENT_BASE_URLS = os.getenv("AGENT_BASE_URLS", DEFAULT_DIRECTORY)
+PROBE_INTERVAL = float(os.getenv("AGENT_PROBE_INTERVAL", "15"))
+PROBE_TIMEOUT = 2.0
+
+
+def parse_directory(spec):
+    """[(label, base_url)] from "Label=http://host:port,..."."""
+    entries = []
+    for item in spec.split(","):
+        label, _, base_url = item.strip().partition("=")
+        if base_url:
+            entries.append((label.strip(), base_url.strip().rstrip("/")))
+    return entries
+
+
+def max_age(cache_control):
+    for directive in (cache_control or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "max-age" and value.isdigit():
+            return int(value)
+    return 0
+
+
+@dataclass
+class AgentEntry:
+    label: str
+    base_url: str
+    card: dict = None
+    etag: str = None
+    max_age: int = 0
+    fetched_at: float = 0.0
+    healthy: bool = False
+    last_error: str = None
+    last_probe: float = 0.0
+    skills: list = field(default_factory=list)
+
+    @property
+    def card_url(self):
+        return f"{self.base_url}/.well-known/agent.json"
+
+    @property
+    def rpc_url(self):
+        """The card's `endpoint` when it lies under `base_url`, else `<base_url>/rpc`.
+
+        Standalone agents serve their card files unchanged (`http://localhost:800X/rpc`), which is
+        wrong whenever the agent is reached at another host or port, e.g. a pod address.
+        """
+        endpoint = (self.card or {}).get("endpoint") or ""
+        if endpoint.startswith(f"{self.base_url}/"):
+            return endpoint
+        return f"{self.base_url}/rpc"
+
+    @property
+    def card_fresh(self):
+        return self.card is not None and time.time() - self.fetched_at < self.max_age
+
+
+class AgentRegistry:
+    """Discovers agents from their cards and keeps a health flag per agent.
+
+    Every `probe_interval` seconds each agent gets a conditional card request
+    (`If-None-Match` with the cached ETag), so a healthy, unchanged agent
+    answers with a bodyless 304. A card still fresh under its
+    `Cache-Control: max-age` is kept even if a probe fails; the agent is
+    just marked unhealthy until the next successful probe.
+    """
+
+    def __init__(self, agent_client, directory=None, probe_interval=PROBE_INTERVAL):
+        self._client = agent_client
+        self.entries = [AgentEntry(label, url) for label, url in (directory or parse_directory(AGENT_BASE_URLS))]
+        self.probe_interval = probe_interval
+        self._probe_task = None
+
+    async def probe(self, entry):
+        # Only revalidate a card we still hold: a 304 carries no card to fall back on.
+        headers = {"If-None-Match": entry.etag} if entry.etag and entry.card is not None else {}
+        entry.last_probe = time.time()
+        try:
+            resp = await self._client.get(entry.card_url, headers=headers, timeout=PROBE_TIMEOUT)
+            if resp.status_code == 304 and entry.card is not None:
+                entry.fetched_at = time.time()
+                entry.max_age = max_age(resp.headers.get("cache-control")) or entry.max_age
+            else:
+                resp.raise_for_status()
+                card = resp.json()
+                if "error" in card:
+                    raise ValueError(card["error"])
+                entry.card = card
+                entry.etag = resp.headers.get("etag")
+                entry.max_age = max_age(resp.headers.get("cache-control"))
+                entry.fetched_at = time.time()
+                entry.skills = [skill.get("name") for skill in card.get("skills", [])]
+            entry.healthy = True
+            entry.last_error = None
+        except (httpx.HTTPError, ValueError) as e:
+            entry.healthy = False
+            entry.last_error = str(e) or type(e).__name__
+            if not entry.card_fresh:
+                entry.card = None
+                entry.etag = None
+
+    async def refresh(self):
+        await asyncio.gather(*(self.probe(entry) for entry in self.entries))
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.refresh()
+
+    def start(self):
+        """Probe everything once (blocking) and keep probing in the background."""
+        self._client.submit(self.refresh()).result()
+        if self._probe_task is None:
+            self._probe_task = self._client.submit(self._probe_loop())
+
+    def healthy(self):
+        return [entry for entry in self.entries if entry.healthy]
@@ -0,0 +1,57 @@
+import math
+import os
+from dataclasses import dataclass
+
+ROUTING_QUANTILE = float(os.getenv("ROUTING_QUANTILE", "0.9"))         # latency quantile checked against the budget
+ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", "3"))       # successful calls before a latency is trusted
+ROUTING_EXPLORATION = float(os.getenv("ROUTING_EXPLORATION", "0.5"))  # weight of the exploration bonus
+ELO_BASE = 1000.0
+
+
+@dataclass
+class RouteChoice:
+    label: str
+    url: str
+    score: float
+    latency: float = None  # the ROUTING_QUANTILE latency, None while the agent is cold
+    reason: str = ""
+
+
+def win_probability(rating):
+    """Chance of being preferred over an average agent, from a rating on the Elo scale."""
+    return 1.0 / (1.0 + 10.0 ** ((ELO_BASE - rating) / 400.0))
+
+
+def route(candidates, tracker, ratings, latency_budget, max_fanout, exploration=ROUTING_EXPLORATION,
+          quantile=ROUTING_QUANTILE, min_samples=ROUTING_MIN_SAMPLES):
+    """Pick at most `max_fanout` of `candidates` [(label, url)] to ask; returns (chosen, skipped).
+
+    Each agent's value is its chance of giving the preferred answer (from
+    `ratings`, label -> Bradley-Terry rating; 0.5 when unrated) times its
+    success rate, plus a UCB-style bonus that shrinks as the agent gets
+    more calls, so cold agents are still tried. Agents whose latency at
+    `quantile` exceeds `latency_budget` are left out; if that leaves
+    nobody, the fastest agent is asked.
+    """
+    profiles = [(label, url, tracker.profile(label, quantile, min_samples)) for label, url in candidates]
+    total_calls = sum(calls for _, _, (calls, _, _) in profiles)
+
+    fits, too_slow = [], []
+    for label, url, (calls, error_rate, latency) in profiles:
+        quality = win_probability(ratings[label]) if label in ratings else 0.5
+        bonus = exploration * math.sqrt(math.log(total_calls + 1) / (calls + 1))
+        choice = RouteChoice(label, url, quality * (1.0 - error_rate) + bonus, latency)
+        if latency is not None and latency > latency_budget:
+            choice.reason = f"p{quantile * 100:g} {latency:.1f}s over the {latency_budget:g}s budget"
+            too_slow.append(choice)
+        else:
+            fits.append(choice)
+
+    if not fits and too_slow:
+        too_slow.sort(key=lambda choice: choice.latency)
+        fits.append(too_slow.pop(0))
+    fits.sort(key=lambda choice: choice.score, reverse=True)
+    chosen, not_chosen = fits[:max_fanout], fits[max_fanout:]
+    for choice in not_chosen:
+        choice.reason = f"fan-out limited to {max_fanout}"
+    return chosen, too_slow + not_chosen
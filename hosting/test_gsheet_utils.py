@@ -0,0 +1,85 @@
+"""Offline checks of SheetExporter against FakeSheet.
+
+    cd hosting
+    python -m pytest test_gsheet_utils.py
+"""
+import copy
+
+from fake_sheet import FakeSheet
+from gsheet_utils import HEADER, SheetExporter
+
+
+class Aggregates:
+    """Stand-in for the event store's {agent: [clicks, votes]}, changeable between exports."""
+
+    def __init__(self, counts=None):
+        self.counts = counts or {}
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise RuntimeError("event store unavailable")
+        return copy.deepcopy(self.counts)
+
+
+def exporter(aggregates, sheet_factory):
+    return SheetExporter(aggregates, sheet_factory, interval=3600)
+
+
+def test_empty_sheet_gets_header_and_rows():
+    sheet = FakeSheet(header=False)
+    aggregates = Aggregates()
+    export = exporter(aggregates, lambda: sheet)
+    aggregates.counts = {"Groq": [2, 1], "LLaMA": [0, 3]}
+    export.export()
+
+    assert sheet.rows == [HEADER, ["Groq", 2, 1], ["LLaMA", 0, 3]]
+    assert [call[0] for call in sheet.calls] == ["get", "append_rows"]
+
+
+def test_counts_are_added_to_the_sheet_not_overwritten():
+    sheet = FakeSheet([["Groq", "10", "4"]])  # gspread returns cell values as strings
+    aggregates = Aggregates({"Groq": [5, 5]})  # already exported before this exporter started
+    export = exporter(aggregates, lambda: sheet)
+    aggregates.counts = {"Groq": [7, 6], "Gemma": [1, 0]}
+    export.export()
+    assert sheet.counts() == {"Groq": [12, 5], "Gemma": [1, 0]}
+
+    export.export()  # nothing new: no API calls
+    calls = len(sheet.calls)
+    export.export()
+    assert len(sheet.calls) == calls
+
+    aggregates.counts["Gemma"] = [1, 2]
+    export.export()
+    assert sheet.counts() == {"Groq": [12, 5], "Gemma": [1, 2]}
+
+
+def test_exporter_survives_failures_and_retries():
+    sheet = FakeSheet()
+    sheets = [RuntimeError("sheets API down"), sheet]
+
+    def sheet_factory():
+        result = sheets.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    aggregates = Aggregates()
+    aggregates.fail = True
+    export = exporter(aggregates, sheet_factory)  # baseline read fails too
+    aggregates.fail = False
+    export.export()  # takes the baseline now
+    aggregates.counts = {"DeepSeek": [1, 1]}
+
+    export.export()
+    aggregates.fail = True
+    export.export()
+    assert export.export_errors == 3
+    assert sheet.counts() == {}
+
+    aggregates.fail = False
+    export.export()
+    export.close()
+    assert sheet.counts() == {"DeepSeek": [1, 1]}
+    assert export.export_errors == 3